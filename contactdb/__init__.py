@@ -0,0 +1,4 @@
+"""Storage and indexing layer behind the Unified Contact Database app."""
+from contactdb.store import ContactStore, SQLiteContactStore, StaleRecord, open_store, three_way_merge
+
+__all__ = ["ContactStore", "SQLiteContactStore", "StaleRecord", "open_store", "three_way_merge"]
@@ -0,0 +1,195 @@
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+# --- 1. EVENT LOG ---
+SG_TZ = timezone(timedelta(hours=8))
+LEGACY_TS_FORMAT = "%d %b %y, %H:%M"
+# `field` values of the aggregated events written by contactdb.batch; their old/new are JSON.
+BATCH_FIELD = "batch"
+UNDO_FIELD = "undo"
+
+
+class AuditLog:
+    """Append-only audit event log stored next to the contacts table.
+
+    One row per event: epoch timestamp, actor, contact id, and either a field change
+    (field/old/new) or a free-text message. Indexed by contact, by time and by actor, so a
+    card's history and global "who changed what when" queries are paged index reads.
+    An event touching several contacts (a bulk sync) is stored once, filed under its source
+    contact, with the other contacts listed in `audit_members`; per-contact queries include it.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS audit_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            actor TEXT,
+            contact_id INTEGER,
+            field TEXT,
+            old TEXT,
+            new TEXT,
+            msg TEXT
+        );
+        CREATE INDEX IF NOT EXISTS ix_audit_contact ON audit_events(contact_id, ts);
+        CREATE INDEX IF NOT EXISTS ix_audit_ts ON audit_events(ts);
+        CREATE INDEX IF NOT EXISTS ix_audit_actor ON audit_events(actor, ts);
+        CREATE TABLE IF NOT EXISTS audit_members (
+            contact_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (contact_id, seq)
+        ) WITHOUT ROWID;
+    """
+    # Fills audit_members for bulk syncs (and their undos) logged before the table existed.
+    BACKFILL = f"""
+        INSERT OR IGNORE INTO audit_members (contact_id, seq)
+            SELECT CAST(j.key AS INTEGER), e.seq FROM audit_events e, json_each(e.old) j
+            WHERE e.field = '{BATCH_FIELD}' AND CAST(j.key AS INTEGER) IS NOT e.contact_id;
+        INSERT OR IGNORE INTO audit_members (contact_id, seq)
+            SELECT m.contact_id, u.seq FROM audit_events u JOIN audit_members m ON m.seq = CAST(u.new AS INTEGER)
+            WHERE u.field = '{UNDO_FIELD}';
+    """
+    COLUMNS = ("seq", "ts", "actor", "contact_id", "field", "old", "new", "msg")
+
+    def __init__(self, conn, lock):
+        self._conn = conn
+        self._lock = lock
+        new = not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'audit_members'").fetchone()
+        self._conn.executescript(self.SCHEMA)
+        if new:
+            self._conn.executescript(self.BACKFILL)
+
+    INSERT = "INSERT INTO audit_events (ts, actor, contact_id, field, old, new, msg) VALUES (?, ?, ?, ?, ?, ?, ?)"
+
+    @staticmethod
+    def _row(e, now):
+        return (e.get("ts", now), e.get("actor"), e.get("contact_id"), e.get("field"),
+                None if e.get("old") is None else str(e["old"]),
+                None if e.get("new") is None else str(e["new"]), e.get("msg"))
+
+    def append(self, events):
+        """Appends events in one transaction.
+
+        Each event is a dict with `contact_id`, `actor` and `msg` and/or `field`, `old`, `new`;
+        `ts` (epoch seconds) defaults to now. Old/new values are stored as text.
+        """
+        now = time.time()
+        rows = [self._row(e, now) for e in events]
+        if not rows:
+            return
+        with self._lock:
+            if self._conn.in_transaction:
+                self._conn.executemany(self.INSERT, rows)
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(self.INSERT, rows)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record(self, event, members=()):
+        """Appends a single event and returns its sequence number.
+
+        `members` are further contacts the event concerns; it shows in their history too.
+        Call inside the store transaction that makes the change, so both are written together.
+        """
+        with self._lock:
+            seq = self._conn.execute(self.INSERT, self._row(event, time.time())).lastrowid
+            self._conn.executemany("INSERT OR IGNORE INTO audit_members (contact_id, seq) VALUES (?, ?)",
+                                   [(cid, seq) for cid in members if cid != event.get("contact_id")])
+            return seq
+
+    def get(self, seq):
+        rows = self._rows(f"SELECT {', '.join(self.COLUMNS)} FROM audit_events WHERE seq = ?", (seq,))
+        return rows[0] if rows else None
+
+    def _rows(self, sql, params):
+        with self._lock:
+            return [dict(zip(self.COLUMNS, r)) for r in self._conn.execute(sql, params)]
+
+    def _where(self, contact_id=None, actor=None, since=None, until=None, field=None, new=None):
+        where, params = [], []
+        if contact_id is not None:
+            where.append("(contact_id = ? OR seq IN (SELECT seq FROM audit_members WHERE contact_id = ?))")
+            params += [contact_id, contact_id]
+        for clause, value in (("actor = ?", actor), ("ts >= ?", since),
+                              ("ts < ?", until), ("field = ?", field), ("new = ?", new)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(where) if where else ""), params
+
+    def query(self, contact_id=None, actor=None, since=None, until=None, field=None, limit=50, offset=0):
+        """Returns matching events newest first, one page at a time."""
+        where, params = self._where(contact_id, actor, since, until, field)
+        return self._rows(f"SELECT {', '.join(self.COLUMNS)} FROM audit_events{where} "
+                          "ORDER BY ts DESC, seq DESC LIMIT ? OFFSET ?", params + [limit, offset])
+
+    def count(self, contact_id=None, actor=None, since=None, until=None, field=None, new=None):
+        where, params = self._where(contact_id, actor, since, until, field, new)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM audit_events{where}", params).fetchone()[0]
+
+    def for_contacts(self, contact_ids):
+        """Returns {contact_id: [events oldest first]} for the given contacts in one query."""
+        columns = ", ".join(f"e.{c}" for c in self.COLUMNS)
+        sql = (f"SELECT {columns}, e.contact_id FROM audit_events e "
+               "WHERE e.contact_id IN (SELECT value FROM json_each(?)) "
+               f"UNION ALL SELECT {columns}, m.contact_id FROM audit_members m JOIN audit_events e ON e.seq = m.seq "
+               "WHERE m.contact_id IN (SELECT value FROM json_each(?)) ORDER BY 2, 1")
+        ids = json.dumps(list(contact_ids))
+        out = {}
+        with self._lock:
+            rows = self._conn.execute(sql, (ids, ids)).fetchall()
+        for *row, owner in rows:
+            out.setdefault(owner, []).append(dict(zip(self.COLUMNS, row)))
+        return out
+
+    def actors(self):
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT actor FROM audit_events ORDER BY actor")]
+
+
+# --- 2. HELPERS ---
+def describe(event):
+    """One-line summary of an event for display."""
+    if event.get("field") in (BATCH_FIELD, UNDO_FIELD):
+        return event.get("msg") or ""
+    if event.get("field"):
+        change = f"**{event['field'].replace('_', ' ').title()}**: '{event.get('old')}' ➜ '{event.get('new')}'"
+        return f"{event['msg']} · {change}" if event.get("msg") else change
+    return event.get("msg") or ""
+
+
+def format_ts(ts):
+    """Formats an epoch timestamp in Singapore time, in the app's usual style."""
+    return datetime.fromtimestamp(ts, SG_TZ).strftime(LEGACY_TS_FORMAT)
+
+
+def _legacy_epoch(text):
+    try:
+        return datetime.strptime(text, LEGACY_TS_FORMAT).replace(tzinfo=SG_TZ).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def migrate_record_history(store):
+    """Moves in-record `history` lists into the audit log and drops them from the records.
+
+    Runs as a cheap no-op once every record has been migrated. Returns the number of records moved.
+    """
+    ids = [cid for cid, history in store.project(("id", "history")) if history is not None]
+    if not ids:
+        return 0
+    records = store.get_many(ids)
+    events = []
+    for r in records:
+        for h in r.pop("history", None) or []:
+            events.append({"ts": _legacy_epoch(h.get("ts")), "actor": h.get("user"),
+                           "contact_id": r["id"], "msg": h.get("msg")})
+    with store.transaction():
+        store.audit.append(events)
+        store.save_many(records)
+    return len(records)
@@ -0,0 +1,78 @@
+import json
+
+from contactdb.audit import BATCH_FIELD, UNDO_FIELD
+
+# --- 1. DRY RUN ---
+def plan(store, ids, changes, where=None):
+    """Returns the diff a batch update would make, without writing anything.
+
+    One entry per record and changed field: {"id", "name", "field", "old", "new"}. Records that
+    fail the optional `where(record)` predicate, or already hold the new value, are left out.
+    """
+    diff = []
+    for r in store.get_many(ids):
+        if where is not None and not where(r):
+            continue
+        for field, value in changes.items():
+            if r.get(field) != value:
+                diff.append({"id": r["id"], "name": r.get("name"), "field": field, "old": r.get(field), "new": value})
+    return diff
+
+
+# --- 2. APPLY & UNDO ---
+def apply(store, ids, changes, actor, label, where=None, source_id=None, ts=None):
+    """Applies `changes` to the selected records as one atomic step.
+
+    The records are written with a single `save_many` and the whole batch is logged as one
+    audit event whose `old` holds every previous value, so it can be reverted with `undo`.
+    `source_id` is the contact the values were synced from; the event is filed under it and
+    listed in the history of every contact it changed.
+    Returns (event seq, number of records changed); the seq is None when nothing changed.
+    """
+    with store.transaction():
+        # Re-planned inside the transaction so `old` reflects exactly what is overwritten.
+        diff = plan(store, ids, changes, where)
+        if not diff:
+            return None, 0
+        old = {}
+        for d in diff:
+            old.setdefault(d["id"], {})[d["field"]] = d["old"]
+        records = store.get_many(list(old))
+        for r in records:
+            r.update({f: changes[f] for f in old[r["id"]]})
+            r["last_updated_at"], r["last_updated_by_name"] = ts, f"Sync via {actor}"
+        store.save_many(records)
+        seq = store.audit.record({
+            "actor": actor, "contact_id": source_id, "field": BATCH_FIELD,
+            "old": json.dumps(old, default=str), "new": json.dumps(changes, default=str),
+            "msg": f"Bulk Sync ({label}): {len(records)} contacts",
+        }, members=list(old))
+    return seq, len(records)
+
+
+def undo(store, seq, actor, ts=None):
+    """Restores the values a batch event overwrote. Returns the number of records restored.
+
+    Fields that have been edited again since the sync keep their newer value. Raises
+    ValueError if `seq` is not a batch event or has already been undone.
+    """
+    with store.transaction():
+        event = store.audit.get(seq)
+        if event is None or event["field"] != BATCH_FIELD:
+            raise ValueError(f"Audit event {seq} is not a bulk sync.")
+        if store.audit.count(field=UNDO_FIELD, new=str(seq)):
+            raise ValueError("This bulk sync has already been undone.")
+        old = {int(cid): fields for cid, fields in json.loads(event["old"]).items()}
+        synced = json.loads(event["new"])
+        records = []
+        for r in store.get_many(list(old)):
+            restore = {f: v for f, v in old[r["id"]].items() if r.get(f) == synced.get(f)}
+            if restore:
+                r.update(restore)
+                r["last_updated_at"], r["last_updated_by_name"] = ts, f"Undo via {actor}"
+                records.append(r)
+        if records:
+            store.save_many(records)
+        store.audit.record({"actor": actor, "contact_id": event["contact_id"], "field": UNDO_FIELD,
+                            "old": None, "new": str(seq), "msg": f"Undo {event['msg']}"}, members=list(old))
+    return len(records)
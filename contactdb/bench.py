@@ -0,0 +1,184 @@
+"""Benchmarks for the contact store, its indexes and the dashboard script, on synthetic data.
+
+    python -m contactdb.bench --sizes 1000 10000 --save baseline.json
+    python -m contactdb.bench --sizes 1000 10000 --compare baseline.json
+
+Each stage is timed on a freshly generated contact set per size. `--compare` reports stages
+that got slower than the baseline by more than the tolerance and exits non-zero if any did.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from contactdb.audit import migrate_record_history
+from contactdb.birthdays import BirthdayIndex
+from contactdb.columnar import ContactFrame
+from contactdb.dedupe import DuplicateIndex
+from contactdb.export import iter_frames, write_export
+from contactdb.facets import FacetCounts
+from contactdb.hierarchy import OrgGraph
+from contactdb.importer import LIST_COLUMNS, import_csv, scan_csv
+from contactdb.photos import PhotoStore
+from contactdb.search import SearchIndex
+from contactdb.store import open_store
+from contactdb.synthetic import CATEGORIES, COUNTRIES, TIERS, generate_contacts
+
+# --- 1. STAGES ---
+APP_PATH = Path(__file__).resolve().parents[1] / "streamlit_app.py"
+CATEGORY_PRIORITY = {c: i + 1 for i, c in enumerate(CATEGORIES)}
+ALLOWED = {"country": list(COUNTRIES), "category": CATEGORIES, "tier": TIERS}
+# Columns the app's import template leaves out.
+NOT_IMPORTED = ("id", "history", "comments", "last_updated_at", "last_updated_by_name")
+SEARCH_QUERIES = ("tan", "company:global", "appt:director", "singapre", "golf hiking", "wei tan")
+LISTING_FILTERS = ((None, None), (["Singapore"], None), (["Singapore", "Japan"], ["Chief", "Local"]))
+DEFAULT_SIZES = (1000, 10000)
+# Slowdowns smaller than this are treated as noise whatever the ratio.
+MIN_REGRESSION_SECONDS = 0.005
+
+
+def _timed(fn, repeat=1):
+    """Runs `fn` `repeat` times; returns (best wall time in seconds, last result)."""
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _mean_timed(fn, args_list, repeat=3):
+    return statistics.mean(_timed(lambda: fn(*args), repeat)[0] for args in args_list)
+
+
+def _import_file(contacts, columns):
+    df = pd.DataFrame.from_records(contacts, columns=columns)
+    for col in LIST_COLUMNS:
+        df[col] = ["; ".join(v) for v in df[col]]
+    return df.to_csv(index=False)
+
+
+def _app_runs(db_path, photo_dir, timeout):
+    """Times a first (cold caches) and a second run of the script through AppTest."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    saved = {k: os.environ.get(k) for k in ("CONTACTS_DB_PATH", "CONTACTS_PHOTO_DIR")}
+    os.environ.update(CONTACTS_DB_PATH=db_path, CONTACTS_PHOTO_DIR=photo_dir)
+    try:
+        st.cache_resource.clear()
+        at = AppTest.from_file(str(APP_PATH), default_timeout=timeout)
+        cold, _ = _timed(at.run)
+        warm, _ = _timed(at.run)
+        if at.exception:
+            raise RuntimeError(f"App raised: {at.exception[0].value}")
+        st.cache_resource.clear()
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    return cold, warm
+
+
+def run(size, workdir, seed=0, app=True, timeout=600):
+    """Runs every stage on `size` generated contacts. Returns {stage: seconds}."""
+    out = {}
+    out["generate"], contacts = _timed(lambda: generate_contacts(size, seed))
+    columns = [k for k in contacts[0] if k not in NOT_IMPORTED]
+    csv_text = _import_file(contacts, columns)
+
+    scratch = open_store(":memory:")
+    out["bulk_import"], _ = _timed(lambda: import_csv(scratch, io.StringIO(csv_text), columns, ALLOWED, "bench", "ts"))
+    dupes = DuplicateIndex.from_store(scratch)
+    out["duplicate_scan"], _ = _timed(lambda: scan_csv(dupes, io.StringIO(csv_text), columns, ALLOWED))
+
+    db_path = os.path.join(workdir, f"contacts_{size}.db")
+    store = open_store(db_path)
+    out["insert_many"], _ = _timed(lambda: store.insert_many(contacts))
+    out["history_migration"], _ = _timed(lambda: migrate_record_history(store))
+    photo_dir = os.path.join(workdir, f"photos_{size}")
+    out["photo_migration"], _ = _timed(lambda: PhotoStore(photo_dir).migrate_data_urls(store))
+
+    out["search_build"], search = _timed(lambda: SearchIndex.from_store(store))
+    out["search_query"] = _mean_timed(search.search, [(q,) for q in SEARCH_QUERIES])
+    out["sort_build"], frame = _timed(lambda: ContactFrame.from_store(store, CATEGORY_PRIORITY))
+    out["filter_listing"] = _mean_timed(frame.listing, LISTING_FILTERS)
+    out["hierarchy_build"], graph = _timed(lambda: OrgGraph.from_store(store))
+    out["hierarchy_views"], _ = _timed(lambda: (graph.depths(), [graph.tree(c) for c in graph.companies()]))
+    out["facet_build"], facets = _timed(lambda: FacetCounts.from_store(store))
+    out["facet_counts"] = _mean_timed(lambda c, k: facets.filter_counts("country", c, k), LISTING_FILTERS)
+    today = date.today()
+    out["birthday_pool"], _ = _timed(lambda: BirthdayIndex.from_store(store).months(today, 3))
+    out["export_csv"], _ = _timed(lambda: write_export("CSV", iter_frames(store, None, columns)).read())
+    if app:
+        out["app_cold_run"], out["app_rerun"] = _app_runs(db_path, photo_dir, timeout)
+    return out
+
+
+# --- 2. REPORTING ---
+def report(results, baseline=None, tolerance=0.25):
+    """Prints a stage x size table in ms. Returns the (size, stage) pairs that regressed."""
+    sizes = list(results)
+    stages = list(dict.fromkeys(s for r in results.values() for s in r))
+    regressions = []
+    print(f"{'stage':<20}" + "".join(f"{size:>14}" for size in sizes) + "   (ms)")
+    for stage in stages:
+        cells = []
+        for size in sizes:
+            now = results[size].get(stage)
+            before = (baseline or {}).get(size, {}).get(stage)
+            cell = "-" if now is None else f"{now * 1000:.1f}"
+            if now is not None and before:
+                ratio = now / before
+                slower = ratio > 1 + tolerance and now - before > MIN_REGRESSION_SECONDS
+                cell += f" {ratio:.2f}x{'!' if slower else ''}"
+                if slower:
+                    regressions.append((size, stage))
+            cells.append(f"{cell:>14}")
+        print(f"{stage:<20}" + "".join(cells))
+    if baseline is not None:
+        print(f"{len(regressions)} regression(s) beyond {tolerance:.0%}: "
+              + (", ".join(f"{stage}@{size}" for size, stage in regressions) or "none"))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-app", action="store_true", help="skip the AppTest script runs")
+    parser.add_argument("--save", metavar="JSON", help="write the results as a baseline file")
+    parser.add_argument("--compare", metavar="JSON", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio (default 0.25)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            results[str(size)] = run(size, workdir, seed=args.seed, app=not args.no_app)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    regressions = report(results, baseline, args.tolerance)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"date": date.today().isoformat(), "python": platform.python_version(),
+                       "seed": args.seed, "results": results}, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
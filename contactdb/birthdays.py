@@ -0,0 +1,151 @@
+import calendar
+import threading
+from collections import defaultdict
+from datetime import date, timedelta
+
+# --- 1. CALENDAR INDEX ---
+MILESTONES = (50, 60, 65)
+
+_ROW_FIELDS = ("id", "name", "birthdate")
+
+
+def _as_date(value):
+    if isinstance(value, date) or value is None:
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+class BirthdayIndex:
+    """(month, day) -> contact ids index behind the Birthday Spotlight.
+
+    Kept current through `ContactStore.subscribe`; a window query touches one bucket per day
+    in the window instead of every contact. Display labels are formatted once per write.
+    """
+
+    def __init__(self):
+        self.buckets = defaultdict(set)  # (month, day) -> ids
+        self.people = {}                 # id -> (name, birthdate, "05 Jan")
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, store):
+        index = cls()
+        index.update([{"id": r[0], "name": r[1], "birthdate": r[2]} for r in store.project(_ROW_FIELDS)])
+        store.subscribe(index.update)
+        return index
+
+    def update(self, records):
+        with self._lock:
+            for r in records:
+                cid, bday = r["id"], _as_date(r.get("birthdate"))
+                old = self.people.pop(cid, None)
+                if old is not None:
+                    self.buckets[(old[1].month, old[1].day)].discard(cid)
+                if bday is not None:
+                    self.people[cid] = (r.get("name"), bday, bday.strftime("%d %b"))
+                    self.buckets[(bday.month, bday.day)].add(cid)
+
+    # Queries
+    def _day_events(self, day):
+        """The birthdays falling on `day`, by name. Feb 29 birthdays fall on Feb 28 in non-leap years."""
+        keys = [(day.month, day.day)]
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            keys.append((2, 29))
+        events = []
+        for key in keys:
+            for cid in self.buckets.get(key, ()):
+                name, bday, label = self.people[cid]
+                turning = day.year - bday.year
+                events.append({"id": cid, "name": name, "date": day, "label": label,
+                               "turning": turning, "milestone": turning in MILESTONES})
+        events.sort(key=lambda e: e["name"] or "")
+        return events
+
+    def _day_count(self, day):
+        n = len(self.buckets.get((day.month, day.day), ()))
+        if day.month == 2 and day.day == 28 and not calendar.isleap(day.year):
+            n += len(self.buckets.get((2, 29), ()))
+        return n
+
+    def between(self, start, end):
+        """Returns the birthdays falling in [start, end], sorted by date then name.
+
+        Each entry has the occurrence `date`, the age being `turning`, and a `milestone` flag.
+        """
+        with self._lock:
+            return [e for day in _days(start, end) for e in self._day_events(day)]
+
+    def spotlight(self, start, end, per_month):
+        """Returns (year, month, first `per_month` birthdays, total) for each month in [start, end].
+
+        Only the birthdays shown are built; the rest of a month is counted from its day buckets,
+        so the cost does not grow with the number of contacts sharing the month.
+        """
+        with self._lock:
+            months = {}
+            for day in _days(start, end):
+                shown, total = months.setdefault((day.year, day.month), ([], [0]))
+                n = self._day_count(day)
+                total[0] += n
+                if n and len(shown) < per_month:
+                    shown += self._day_events(day)[:per_month - len(shown)]
+            return [(y, m, shown, total[0]) for (y, m), (shown, total) in months.items()]
+
+    def next_days(self, today, days):
+        return self.between(*days_window(today, days))
+
+    def this_week(self, today):
+        return self.between(*week_window(today))
+
+    def this_month(self, today):
+        return self.months(today, 1)
+
+    def months(self, today, count):
+        return self.between(*months_window(today, count))
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+# Windows, as (first day, last day)
+def days_window(today, days):
+    return today, today + timedelta(days=days - 1)
+
+
+def week_window(today):
+    monday = today - timedelta(days=today.weekday())
+    return monday, monday + timedelta(days=6)
+
+
+def months_window(today, count):
+    """Whole calendar months: the current one and the `count - 1` after it."""
+    last_y, last_m = divmod(today.year * 12 + today.month - 1 + count - 1, 12)
+    last_m += 1
+    return today.replace(day=1), date(last_y, last_m, calendar.monthrange(last_y, last_m)[1])
+
+
+# --- 2. ICAL EXPORT ---
+def to_ics(events, calendar_name="Birthday Spotlight"):
+    """Renders birthday events as an iCalendar (.ics) document of all-day entries."""
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//Unified Contact Database//Birthdays//EN",
+             f"X-WR-CALNAME:{calendar_name}"]
+    for e in events:
+        start = e["date"]
+        summary = f"🎂 {e['name']} turns {e['turning']}" + (" (milestone)" if e["milestone"] else "")
+        summary = summary.replace(",", "\\,").replace(";", "\\;")
+        lines += ["BEGIN:VEVENT",
+                  f"UID:birthday-{e['id']}-{start:%Y}@contacts",
+                  f"DTSTAMP:{start:%Y%m%d}T000000Z",
+                  f"DTSTART;VALUE=DATE:{start:%Y%m%d}",
+                  f"DTEND;VALUE=DATE:{start + timedelta(days=1):%Y%m%d}",
+                  f"SUMMARY:{summary}",
+                  "END:VEVENT"]
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(lines) + "\r\n"
@@ -0,0 +1,207 @@
+import threading
+from bisect import bisect_left
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# --- 1. PROJECTION ---
+SOURCE_COLUMNS = ("id", "name", "company", "country", "category", "tier", "birthdate")
+# Derived once per write rather than per row on every rerun.
+DERIVED_COLUMNS = ("birth_year", "birth_md", "birthdate_label", "country_key", "company_key",
+                   "category_priority", "country_code", "category_code")
+INT_COLUMNS = ("id", "birth_year", "birth_md", "category_priority", "country_code", "category_code")
+# Dictionary-encoded so the sidebar filters are table lookups instead of string comparisons.
+ENCODED_COLUMNS = ("country", "category")
+# Batches touching more rows than this re-sort everything instead of repositioning rows one by one.
+RESORT_THRESHOLD = 256
+
+
+def _iso(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10] if value else None
+
+
+def _series(arr):
+    # Keep object columns as-is; letting pandas infer a string dtype would copy every value.
+    return pd.Series(arr, dtype=arr.dtype, copy=False)
+
+
+class ContactFrame:
+    """Columnar projection of the listing fields, with derived columns precomputed.
+
+    Columns are numpy arrays with one slot per contact; `order` holds the slots in dashboard
+    order (country, company case-insensitively, category priority, id) and sorted copies of
+    the columns are cached. The sidebar filters are lookup-table masks over those copies, so a
+    rerun never sorts or loops over rows in Python.
+
+    Kept current through `ContactStore.subscribe`. Writes are buffered and folded in on the
+    next read: edits that leave the sort keys alone patch the cached columns in place, rows
+    whose keys changed are moved by binary search, and only bulk writes re-sort everything.
+    """
+
+    def __init__(self, category_priority):
+        self.category_priority = category_priority
+        self.cols = {c: np.empty(0, dtype=np.int64 if c in INT_COLUMNS else object)
+                     for c in SOURCE_COLUMNS + DERIVED_COLUMNS}
+        self.codes = {c: {} for c in ENCODED_COLUMNS}   # column -> {value: code}
+        self.size = 0
+        self.slot = {}                                  # id -> array slot
+        self.order = np.empty(0, dtype=np.int64)        # slots in listing order
+        self.rank = np.empty(0, dtype=np.int64)         # slot -> position in `order`
+        self._sorted = {}                               # column -> values in listing order
+        self._pending = {}                              # id -> row tuple, not yet applied
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, store, category_priority):
+        frame = cls(category_priority)
+        frame._apply({r[0]: (*r[:6], _iso(r[6])) for r in store.project(SOURCE_COLUMNS)})
+        store.subscribe(frame.update)
+        return frame
+
+    def __len__(self):
+        with self._lock:
+            self._flush()
+            return self.size
+
+    # Maintenance
+    def update(self, records):
+        """Store listener: buffers the changed rows until the next read."""
+        with self._lock:
+            for r in records:
+                self._pending[r["id"]] = (r["id"], *(r.get(k) for k in SOURCE_COLUMNS[1:6]), _iso(r.get("birthdate")))
+
+    def _flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, {}
+            self._apply(pending)
+
+    def _encode(self, column, values):
+        codes = self.codes[column]
+        for v in set(values) - codes.keys():
+            codes[v] = len(codes)
+        return np.fromiter((codes[v] for v in values), dtype=np.int64, count=len(values))
+
+    def _derive(self, rows):
+        """Builds the source and derived columns for a batch of rows, vectorized."""
+        df = pd.DataFrame.from_records(list(rows), columns=list(SOURCE_COLUMNS)).astype(object)
+        df = df.where(df.notna(), None)
+        bday = pd.to_datetime(df["birthdate"], format="%Y-%m-%d", errors="coerce")
+        df["birth_year"] = bday.dt.year.fillna(0).astype(np.int64)
+        df["birth_md"] = (bday.dt.month * 100 + bday.dt.day).fillna(0).astype(np.int64)
+        df["birthdate_label"] = bday.dt.strftime("%d %b %Y").fillna("N/A").astype(object)
+        df["country_key"] = df["country"].fillna("zzz").astype(str).str.lower().astype(object)
+        df["company_key"] = df["company"].fillna("zzz").astype(str).str.lower().astype(object)
+        df["category_priority"] = df["category"].map(self.category_priority).fillna(5).astype(np.int64)
+        for c in ENCODED_COLUMNS:
+            df[f"{c}_code"] = self._encode(c, df[c].tolist())
+        return df
+
+    def _apply(self, rows):
+        df = self._derive(rows.values())
+        slots = np.array([self.slot.get(cid, -1) for cid in df["id"].tolist()], dtype=np.int64)
+        is_new = slots < 0
+        n_new = int(is_new.sum())
+        if n_new:
+            self._grow(self.size + n_new)
+            slots[is_new] = np.arange(self.size, self.size + n_new)
+            self.slot.update(zip(df["id"][is_new].tolist(), slots[is_new].tolist()))
+            self.size += n_new
+        moved = is_new.copy()
+        for k in ("country_key", "company_key", "category_priority"):
+            moved |= self.cols[k][slots] != df[k].to_numpy()
+        for c in SOURCE_COLUMNS + DERIVED_COLUMNS:
+            self.cols[c][slots] = df[c].to_numpy()
+
+        moved_slots = slots[moved]
+        if len(moved_slots) > RESORT_THRESHOLD:
+            self._resort()
+        elif len(moved_slots):
+            order = self.order[~np.isin(self.order, moved_slots)]
+            for s in moved_slots.tolist():
+                order = np.insert(order, bisect_left(order, self._key(s), key=self._key), s)
+            self._set_order(order)
+        else:
+            # Order unchanged: patch the cached sorted columns in place.
+            pos = self.rank[slots]
+            for c, arr in self._sorted.items():
+                arr[pos] = self.cols[c][slots]
+
+    def _grow(self, needed):
+        capacity = len(self.cols["id"])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for c, arr in self.cols.items():
+            grown = np.zeros(capacity, dtype=arr.dtype) if arr.dtype != object else np.empty(capacity, dtype=object)
+            grown[:len(arr)] = arr
+            self.cols[c] = grown
+
+    def _key(self, s):
+        c = self.cols
+        return c["country_key"][s], c["company_key"][s], c["category_priority"][s], c["id"][s]
+
+    def _resort(self):
+        c, n = self.cols, self.size
+        country = pd.factorize(c["country_key"][:n], sort=True)[0]
+        company = pd.factorize(c["company_key"][:n], sort=True)[0]
+        self._set_order(np.lexsort((c["id"][:n], c["category_priority"][:n], company, country)).astype(np.int64))
+
+    def _set_order(self, order):
+        self.order = order
+        self.rank = np.empty(len(self.cols["id"]), dtype=np.int64)
+        self.rank[order] = np.arange(len(order))
+        self._sorted = {}
+
+    def _column(self, c):
+        """Column `c` in listing order, cached until the order changes."""
+        if c not in self._sorted:
+            self._sorted[c] = self.cols[c][self.order]
+        return self._sorted[c]
+
+    def _lookup(self, codes, allowed):
+        table = np.zeros(len(codes) + 1, dtype=bool)
+        table[[codes[v] for v in allowed if v in codes]] = True
+        return table
+
+    # Queries
+    def listing(self, countries=None, categories=None, ids=None, columns=("id", "name", "country", "company")):
+        """Returns the matching contacts in listing order as a DataFrame. Empty/None filters are ignored.
+
+        `ids` restricts the result to a set of contact ids (e.g. search hits).
+        """
+        with self._lock:
+            self._flush()
+            mask = None
+            for col, allowed in (("country", countries), ("category", categories)):
+                if allowed:
+                    hit = self._lookup(self.codes[col], allowed)[self._column(f"{col}_code")]
+                    mask = hit if mask is None else mask & hit
+            if ids is not None:
+                sorted_ids = self._column("id")
+                table = np.zeros(int(sorted_ids.max(initial=0)) + 1, dtype=bool)
+                wanted = np.fromiter(ids, dtype=np.int64)
+                table[wanted[(wanted >= 0) & (wanted < len(table))]] = True
+                mask = table[sorted_ids] if mask is None else mask & table[sorted_ids]
+            data = {c: self._column(c) if mask is None else self._column(c)[mask] for c in columns}
+            return pd.DataFrame({c: _series(v) for c, v in data.items()})
+
+    def ages(self, slots, today):
+        """Age in whole years on `today` for the given slots; -1 where the birthdate is unknown."""
+        year, md = self.cols["birth_year"][slots], self.cols["birth_md"][slots]
+        age = today.year - year - ((today.month * 100 + today.day) < md)
+        return np.where(year > 0, age, -1)
+
+    def row(self, contact_id, today=None):
+        """Returns the projected and derived values for one contact (plus `age`), or None if unknown."""
+        with self._lock:
+            self._flush()
+            s = self.slot.get(contact_id)
+            if s is None:
+                return None
+            out = {c: arr[s] for c, arr in self.cols.items()}
+            age = int(self.ages(np.array([s]), today or date.today())[0])
+            out["age"] = age if age >= 0 else "N/A"
+            return out
@@ -0,0 +1,272 @@
+import re
+import threading
+from collections import defaultdict
+from datetime import date
+from difflib import SequenceMatcher
+
+# --- 1. NORMALIZING & BLOCKING KEYS ---
+_ROW_FIELDS = ("id", "name", "company", "email", "mobile", "birthdate")
+# Evidence weights; a pair's score is their sum (name scaled by similarity), capped at 1.
+WEIGHTS = {"email": 0.6, "mobile": 0.5, "name": 0.45, "company": 0.2, "birthdate": 0.2}
+# Pairs scoring at or above this are reported as likely duplicates.
+MATCH_THRESHOLD = 0.6
+# Name similarity below this contributes nothing.
+MIN_NAME_SIMILARITY = 0.8
+# Blocks larger than this (a common surname at a big company) are too unselective to compare.
+MAX_BLOCK = 64
+# Local part of a phone number; country codes and trunk prefixes are written inconsistently.
+PHONE_DIGITS = 8
+
+HONORIFICS = {"mr", "mrs", "ms", "mdm", "miss", "dr", "prof"}
+COMPANY_SUFFIXES = {"ltd", "limited", "pte", "pty", "inc", "corp", "corporation", "co", "company", "group",
+                    "plc", "llc", "bhd", "sdn", "holdings"}
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+
+def name_tokens(name):
+    return sorted(t for t in _WORD.findall(str(name or "").lower()) if t not in HONORIFICS)
+
+
+def company_key(company):
+    return " ".join(t for t in _WORD.findall(str(company or "").lower()) if t not in COMPANY_SUFFIXES)
+
+
+def phone_key(phone):
+    digits = re.sub(r"\D", "", str(phone or ""))
+    return digits[-PHONE_DIGITS:] if len(digits) >= 7 else ""
+
+
+def _iso(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10] if value else ""
+
+
+def _profile(record):
+    """The normalized fields a record is blocked and scored on."""
+    tokens = name_tokens(record.get("name"))
+    return {
+        "name": record.get("name"), "company_name": record.get("company"),
+        "tokens": tokens, "name_key": " ".join(tokens), "company": company_key(record.get("company")),
+        "email": str(record.get("email") or "").strip().lower(), "mobile": phone_key(record.get("mobile")),
+        "birthdate": _iso(record.get("birthdate")),
+    }
+
+
+def blocking_keys(profile):
+    """Keys under which a record is filed; only records sharing a key are ever compared.
+
+    Exact email, phone digits and order-insensitive full name catch most repeats. Name tokens
+    combined with the company catch typos and dropped middle names at the same employer.
+    """
+    keys = set()
+    if profile["email"]:
+        keys.add(("email", profile["email"]))
+    if profile["mobile"]:
+        keys.add(("mobile", profile["mobile"]))
+    if profile["name_key"]:
+        keys.add(("name", profile["name_key"]))
+    if profile["company"]:
+        keys.update(("company", profile["company"], t) for t in profile["tokens"] if len(t) > 1)
+    return keys
+
+
+def name_similarity(a, b):
+    """Similarity of two profiles' names in [0, 1]: token overlap, or character-level for typos."""
+    if a["name_key"] == b["name_key"]:
+        return 1.0
+    ta, tb = set(a["tokens"]), set(b["tokens"])
+    overlap = len(ta & tb) / len(ta | tb)
+    if overlap >= MIN_NAME_SIMILARITY:
+        return overlap
+    matcher = SequenceMatcher(None, a["name_key"], b["name_key"])
+    # The cheap upper bounds rule out most pairs before the full comparison.
+    if matcher.real_quick_ratio() < MIN_NAME_SIMILARITY or matcher.quick_ratio() < MIN_NAME_SIMILARITY:
+        return overlap
+    return max(overlap, matcher.ratio())
+
+
+def score(a, b):
+    """Returns (score, reasons) for two profiles; reasons name the fields that agreed."""
+    total, reasons = 0.0, []
+    for field in ("email", "mobile", "company"):
+        if a[field] and a[field] == b[field]:
+            total += WEIGHTS[field]
+            reasons.append(field)
+    if a["birthdate"] and b["birthdate"]:
+        # A different birthdate is evidence of two different people.
+        if a["birthdate"] == b["birthdate"]:
+            total += WEIGHTS["birthdate"]
+            reasons.append("birthdate")
+        else:
+            total -= WEIGHTS["birthdate"]
+    # Names are compared last, and only when they could still lift the pair over the threshold.
+    if a["name_key"] and b["name_key"] and total + WEIGHTS["name"] >= MATCH_THRESHOLD:
+        similarity = name_similarity(a, b)
+        if similarity >= MIN_NAME_SIMILARITY:
+            total += WEIGHTS["name"] * similarity
+            reasons.insert(0, "name")
+    return min(total, 1.0), reasons
+
+
+# --- 2. DUPLICATE INDEX ---
+class DuplicateIndex:
+    """Blocking index for finding likely duplicate contacts.
+
+    Every record is filed under a handful of blocking keys; a lookup scores only the records
+    sharing a key with the probe, so checking a whole import file is near-linear in its size.
+    Kept current through `ContactStore.subscribe`. Ids are opaque, so the importer also uses
+    an unsubscribed instance keyed by file row to catch repeats within one file.
+    """
+
+    def __init__(self):
+        self.blocks = defaultdict(set)  # blocking key -> ids
+        self.keys = {}                  # id -> blocking keys
+        self.people = {}                # id -> profile
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, store):
+        index = cls()
+        index.update([dict(zip(_ROW_FIELDS, r)) for r in store.project(_ROW_FIELDS)])
+        store.subscribe(index.update)
+        return index
+
+    def __len__(self):
+        return len(self.people)
+
+    def update(self, records):
+        with self._lock:
+            for r in records:
+                self._remove(r["id"])
+                profile = _profile(r)
+                keys = blocking_keys(profile)
+                self.people[r["id"]], self.keys[r["id"]] = profile, keys
+                for k in keys:
+                    self.blocks[k].add(r["id"])
+
+    def _remove(self, key):
+        self.people.pop(key, None)
+        for k in self.keys.pop(key, ()):
+            block = self.blocks[k]
+            block.discard(key)
+            if not block:
+                del self.blocks[k]
+
+    # Queries
+    def matches(self, record, exclude=(), threshold=MATCH_THRESHOLD, limit=3):
+        """Returns up to `limit` likely duplicates of `record` as (id, score, reasons), best first."""
+        probe = _profile(record)
+        with self._lock:
+            candidates = set()
+            for k in blocking_keys(probe):
+                block = self.blocks.get(k, ())
+                if len(block) <= MAX_BLOCK:
+                    candidates.update(block)
+            found = []
+            for cid in candidates:
+                if cid in exclude:
+                    continue
+                s, reasons = score(probe, self.people[cid])
+                if s >= threshold:
+                    found.append((cid, s, reasons))
+        found.sort(key=lambda m: -m[1])
+        return found[:limit]
+
+    def label(self, key):
+        with self._lock:
+            p = self.people.get(key)
+            return f"{p['name']} · {p['company_name']}" if p else str(key)
+
+
+# --- 3. FIELD-LEVEL MERGE ---
+# Fields never taken from an incoming duplicate.
+KEEP_FIELDS = {"id", "version", "history", "comments", "last_updated_at", "last_updated_by_name"}
+LIST_FIELDS = ("receptions", "festivities")
+
+
+def _blank(value):
+    return value is None or value == "" or value == []
+
+
+def merge_fields(existing, incoming, overwrite=True):
+    """Returns {field: value} changes that fold `incoming` into `existing`.
+
+    Blank incoming values never erase anything and list fields are unioned. With `overwrite`
+    False only fields that are blank on `existing` are filled in.
+    """
+    changes = {}
+    for field, new in incoming.items():
+        if field in KEEP_FIELDS or _blank(new):
+            continue
+        old = existing.get(field)
+        if field in LIST_FIELDS:
+            new = list(old or []) + [v for v in new if v not in (old or [])]
+        elif not (overwrite or _blank(old)):
+            continue
+        if new != old:
+            changes[field] = new
+    return changes
+
+
+def _manager_change(graph, record, incoming, changes, assigned):
+    """Applies the incoming manager's name and id as one unit.
+
+    The graph prefers the id over the name, so an id is only taken along with the name it
+    belongs to, and a new name brings a freshly resolved id. Returns False, dropping the
+    manager change, if it would close a reporting loop given the managers already `assigned`
+    ({id: manager id}) earlier in the same merge.
+    """
+    if "reporting_to" in changes:
+        rep_id = incoming.get("reporting_to_id")
+        if rep_id is None and graph is not None:
+            rep_id = graph.resolve_name(changes["reporting_to"], record.get("company"), exclude=record["id"])
+    elif "reporting_to_id" in changes and incoming.get("reporting_to") == record.get("reporting_to"):
+        rep_id = changes["reporting_to_id"]
+    else:
+        # The incoming manager name was not taken, so neither is its id.
+        changes.pop("reporting_to_id", None)
+        return True
+    if rep_id == record.get("reporting_to_id"):
+        changes.pop("reporting_to_id", None)
+        return True
+    if graph is not None and rep_id is not None and graph.would_cycle(record["id"], rep_id, assigned):
+        changes.pop("reporting_to", None)
+        changes.pop("reporting_to_id", None)
+        return False
+    changes["reporting_to_id"] = rep_id
+    assigned[record["id"]] = rep_id
+    return True
+
+
+def merge(store, incoming, actor, ts, msg, overwrite=True, graph=None):
+    """Folds incoming records into existing contacts, as one write.
+
+    `incoming` maps a contact id to the record being merged into it. Every changed field is
+    logged as its own audit event with `msg`. A changed manager name also replaces
+    `reporting_to_id`: resolved through the OrgGraph `graph` when given, else cleared so the
+    graph resolves the name. With a graph, manager changes that would create a reporting loop
+    are not applied.
+    Returns ({contact id: changes} for the contacts that changed, [ids whose manager change
+    was refused as a loop]).
+    """
+    merged, loops, events, assigned = {}, [], [], {}
+    with store.transaction():
+        records = store.get_many(list(incoming))
+        for r in records:
+            changes = merge_fields(r, incoming[r["id"]], overwrite)
+            manager_changed = "reporting_to" in changes or "reporting_to_id" in changes
+            if manager_changed and not _manager_change(graph, r, incoming[r["id"]], changes, assigned):
+                loops.append(r["id"])
+            if not changes:
+                continue
+            events += [{"contact_id": r["id"], "actor": actor, "field": f, "old": r.get(f), "new": v, "msg": msg}
+                       for f, v in changes.items()]
+            r.update(changes)
+            r["last_updated_at"], r["last_updated_by_name"] = ts, actor
+            merged[r["id"]] = changes
+        if merged:
+            store.save_many([r for r in records if r["id"] in merged])
+            store.audit.append(events)
+    return merged, loops
@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from contactdb.audit import describe, format_ts
+
+# --- 1. FORMATS ---
+EXPORT_FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "XLSX": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+NESTED_COLUMNS = ("history", "comments")
+
+
+def available_formats():
+    """Formats whose optional writer dependency is installed."""
+    formats = ["CSV"]
+    try:
+        import pyarrow.parquet  # noqa: F401
+        formats.append("Parquet")
+    except ImportError:
+        pass
+    try:
+        import openpyxl  # noqa: F401
+        formats.append("XLSX")
+    except ImportError:
+        pass
+    return formats
+
+
+def _flatten_history(events):
+    return "\n".join(f"{format_ts(e['ts'])} | {e['actor']} | {describe(e).replace('**', '')}" for e in events)
+
+
+def _flatten_comments(comments):
+    return "\n".join(f"{m.get('user_name')}: {m.get('text')}" for m in comments or [])
+
+
+# --- 2. STREAMED FRAMES ---
+def iter_frames(store, ids, columns, nested="omit", chunksize=5000):
+    """Yields the export as DataFrames of at most `chunksize` contacts.
+
+    `ids` fixes which contacts are exported and in what order (None exports everything).
+    `nested` is "omit" to drop history/comments or "flatten" to render them as text; history
+    comes from the audit log, one query per chunk.
+    """
+    if ids is None:
+        ids = [r[0] for r in store.project(("id",))]
+    columns = [c for c in columns if nested == "flatten" or c not in NESTED_COLUMNS]
+    for i in range(0, len(ids), chunksize):
+        chunk = ids[i:i + chunksize]
+        records = store.get_many(chunk)
+        df = pd.DataFrame.from_records(records, columns=columns)
+        if "history" in df:
+            history = store.audit.for_contacts(chunk)
+            df["history"] = [_flatten_history(history.get(r["id"], [])) for r in records]
+        if "comments" in df:
+            df["comments"] = [_flatten_comments(v) for v in df["comments"]]
+        for col in ("receptions", "festivities"):
+            if col in df:
+                df[col] = ["; ".join(v) if isinstance(v, list) else v for v in df[col]]
+        # Mixed-type columns (dates next to None, ints next to text) are written as text.
+        yield df.astype("string")
+
+
+def write_export(fmt, frames):
+    """Writes the frames to a temp file in `fmt` and returns it opened for reading.
+
+    Chunks are appended one at a time, so only one chunk is held in memory while writing.
+    The file is unlinked once opened and disappears when the reader is closed.
+    """
+    fd, path = tempfile.mkstemp(suffix=f".{EXPORT_FORMATS[fmt][0]}")
+    with os.fdopen(fd, "wb") as out:
+        _write(fmt, frames, out)
+    reader = open(path, "rb")
+    os.unlink(path)
+    return reader
+
+
+def _write(fmt, frames, out):
+    if fmt == "CSV":
+        first = True
+        for df in frames:
+            out.write(df.to_csv(index=False, header=first).encode("utf-8"))
+            first = False
+    elif fmt == "Parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        for df in frames:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            writer = writer or pq.ParquetWriter(out, table.schema)
+            writer.write_table(table)
+        if writer is not None:
+            writer.close()
+    elif fmt == "XLSX":
+        from openpyxl import Workbook
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Contacts")
+        first = True
+        for df in frames:
+            if first:
+                ws.append(list(df.columns))
+                first = False
+            for row in df.itertuples(index=False):
+                ws.append([None if pd.isna(v) else v for v in row])
+        wb.save(out)
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
@@ -0,0 +1,116 @@
+import threading
+from collections import Counter
+
+# --- 1. COUNTERS ---
+FACET_FIELDS = ("country", "company", "category", "tier", "status", "golf", "dietary")
+# Multi-valued fields: a contact counts once under each value it lists.
+LIST_FIELDS = ("receptions", "festivities")
+ACTIVE_STATUS = "Active"
+
+
+def _value(v):
+    if isinstance(v, str):
+        v = v.strip()
+    return v if v not in ("", None) else None
+
+
+def _values(v):
+    if isinstance(v, str):
+        v = [v]
+    return frozenset(x for x in (_value(x) for x in v or []) if x is not None)
+
+
+def _bump(counter, key, delta):
+    counter[key] += delta
+    if counter[key] <= 0:
+        del counter[key]
+
+
+class FacetCounts:
+    """Contact counts per field value, maintained on every write instead of recomputed.
+
+    Kept current through `ContactStore.subscribe`: each write subtracts the contact's previous
+    values and adds its new ones, so every breakdown is a dictionary read. Country x category
+    counts are kept jointly, giving each sidebar filter's counts under the other filter, and
+    reception/festivity guest lists are split by active status for event headcounts.
+    """
+
+    def __init__(self):
+        self.counts = {f: Counter() for f in FACET_FIELDS}       # field -> value -> contacts
+        self.joint = Counter()                                   # (country, category) -> contacts
+        self.guests = {f: Counter() for f in LIST_FIELDS}        # field -> (value, active) -> contacts
+        self.values = {}                                         # id -> (facet values, list values)
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, store):
+        facets = cls()
+        fields = ("id",) + FACET_FIELDS + LIST_FIELDS
+        facets.update([dict(zip(fields, r)) for r in store.project(fields)])
+        store.subscribe(facets.update)
+        return facets
+
+    def __len__(self):
+        return len(self.values)
+
+    def update(self, records):
+        with self._lock:
+            for r in records:
+                new = (tuple(_value(r.get(f)) for f in FACET_FIELDS), tuple(_values(r.get(f)) for f in LIST_FIELDS))
+                old = self.values.get(r["id"])
+                if old == new:
+                    continue
+                if old is not None:
+                    self._count(old, -1)
+                self._count(new, 1)
+                self.values[r["id"]] = new
+
+    def _count(self, entry, delta):
+        facets, lists = entry
+        row = dict(zip(FACET_FIELDS, facets))
+        for field, value in row.items():
+            _bump(self.counts[field], value, delta)
+        _bump(self.joint, (row["country"], row["category"]), delta)
+        active = row["status"] == ACTIVE_STATUS
+        for field, values in zip(LIST_FIELDS, lists):
+            for value in values:
+                _bump(self.guests[field], (value, active), delta)
+
+    # Queries
+    def breakdown(self, field, limit=None):
+        """[(value, contacts)] for `field`, largest first; None collects contacts with no value."""
+        with self._lock:
+            return self.counts[field].most_common(limit)
+
+    def filter_counts(self, field, countries=None, categories=None, ids=None):
+        """{value: contacts} for the "country" or "category" filter under the other filter.
+
+        A field's own selection is ignored so its options keep showing what selecting them
+        would add. `ids` (e.g. keyword search hits) further restricts the contacts counted.
+        """
+        pos = ("country", "category").index(field)
+        other = categories if field == "country" else countries
+        with self._lock:
+            if ids is not None:
+                out = Counter()
+                for cid in ids:
+                    entry = self.values.get(cid)
+                    if entry is not None:
+                        key = (entry[0][0], entry[0][2])
+                        if not other or key[1 - pos] in other:
+                            out[key[pos]] += 1
+                return out
+            if not other:
+                return dict(self.counts[field])
+            out = Counter()
+            for key, n in self.joint.items():
+                if key[1 - pos] in other:
+                    out[key[pos]] += n
+            return out
+
+    def headcounts(self, field, options):
+        """Guest-list sizes for each of `options` in a list field: [{value, "guests", "active"}]."""
+        with self._lock:
+            counts = self.guests[field]
+            return [{field: value, "guests": counts[(value, True)] + counts[(value, False)],
+                     "active": counts[(value, True)]} for value in options]
@@ -0,0 +1,246 @@
+import threading
+from collections import defaultdict
+
+# --- 1. GRAPH ---
+# Record fields the graph depends on; writes that leave all of these unchanged are ignored.
+GRAPH_FIELDS = ("name", "company", "appointment", "reporting_to", "reporting_to_id")
+
+
+class OrgGraph:
+    """Reporting graph keyed by contact id, with children and per-company indexes.
+
+    Records link to their manager through `reporting_to_id`. Older records that only carry
+    the free-text `reporting_to` name are resolved by name (preferring a match in the same
+    company) and queued in `pending` so the ids can be written back once. Derived views
+    (trees, depths, cycles, stats) are cached and dropped only when a graph field changes.
+    """
+
+    def __init__(self):
+        self.nodes = {}                        # id -> {"name", "company", "appointment"}
+        self.manager = {}                      # id -> manager id
+        self.children = defaultdict(set)       # manager id -> report ids
+        self.by_company = defaultdict(set)     # company -> ids
+        self.by_name = defaultdict(set)        # name -> ids
+        self.raw = {}                          # id -> (reporting_to, reporting_to_id) as stored
+        self.pending = {}                      # id -> resolved manager id not yet persisted
+        self.unresolved = {}                   # id -> manager name that matched no single contact
+        self._cache = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, store):
+        graph = cls()
+        graph._load([dict(zip(("id",) + GRAPH_FIELDS, r)) for r in store.project(("id",) + GRAPH_FIELDS)])
+        store.subscribe(graph.update)
+        return graph
+
+    # Maintenance
+    def update(self, records):
+        """Store listener: applies records whose graph fields changed, ignoring the rest."""
+        with self._lock:
+            changed = [r for r in records if self._key(r) != self._key_of(r["id"])]
+            if changed:
+                self._load(changed)
+
+    def _key(self, r):
+        return tuple(r.get(k) for k in GRAPH_FIELDS)
+
+    def _key_of(self, cid):
+        node = self.nodes.get(cid)
+        if node is None:
+            return None
+        return (node["name"], node["company"], node["appointment"], *self.raw[cid])
+
+    def _load(self, records):
+        self._cache.clear()
+        for r in records:
+            cid = r["id"]
+            old = self.nodes.get(cid)
+            if old is not None:
+                self.by_company[old["company"]].discard(cid)
+                self.by_name[old["name"]].discard(cid)
+            self.nodes[cid] = {"name": r.get("name"), "company": r.get("company"), "appointment": r.get("appointment")}
+            self.by_company[r.get("company")].add(cid)
+            self.by_name[r.get("name")].add(cid)
+            self.raw[cid] = (r.get("reporting_to"), r.get("reporting_to_id"))
+        # Links are resolved after every node of the batch exists, so a batch may reference itself.
+        for r in records:
+            self._link(r["id"], self._resolve(r))
+        # Earlier records may have been waiting for a manager that only this batch introduced.
+        names = {r.get("name") for r in records}
+        for cid, rep_name in list(self.unresolved.items()):
+            if rep_name in names:
+                self._link(cid, self._resolve({"id": cid, "company": self.nodes[cid]["company"],
+                                               "reporting_to": rep_name}))
+
+    def _resolve(self, r):
+        cid = r["id"]
+        self.pending.pop(cid, None)
+        self.unresolved.pop(cid, None)
+        rep_id = r.get("reporting_to_id")
+        if rep_id is not None:
+            return rep_id if rep_id in self.nodes else None
+        rep_name = r.get("reporting_to")
+        if not rep_name:
+            return None
+        found = self.resolve_name(rep_name, r.get("company"), exclude=cid)
+        if found is None:
+            self.unresolved[cid] = rep_name
+        else:
+            self.pending[cid] = found
+        return found
+
+    def resolve_name(self, name, company=None, exclude=None):
+        """Returns the id for a manager `name`, or None when unknown or ambiguous."""
+        with self._lock:
+            candidates = self.by_name.get(name, set()) - {exclude}
+            if len(candidates) > 1 and company is not None:
+                same = {i for i in candidates if self.nodes[i]["company"] == company}
+                candidates = same or candidates
+            return next(iter(candidates)) if len(candidates) == 1 else None
+
+    def _link(self, cid, manager_id):
+        old = self.manager.pop(cid, None)
+        if old is not None:
+            self.children[old].discard(cid)
+        if manager_id is not None:
+            self.manager[cid] = manager_id
+            self.children[manager_id].add(cid)
+
+    def flush(self, store):
+        """Writes resolved legacy links back as `reporting_to_id`. A no-op when nothing is pending."""
+        with self._lock:
+            if not self.pending:
+                return 0
+            pending, self.pending = self.pending, {}
+        # Written outside the graph lock: the store notifies this graph while holding its own lock.
+        # Read and write share one transaction, so an edit saved meanwhile is never overwritten;
+        # records whose manager was set or renamed since the link was resolved are left alone.
+        with store.transaction():
+            records = [r for r in store.get_many(list(pending)) if r.get("reporting_to_id") is None
+                       and self.resolve_name(r.get("reporting_to"), r.get("company"), exclude=r["id"]) == pending[r["id"]]]
+            for r in records:
+                r["reporting_to_id"] = pending[r["id"]]
+            if records:
+                store.save_many(records)
+        return len(records)
+
+    # Queries
+    # Sessions read through these locked accessors, which return snapshots, never the live dicts:
+    # another session's write may be adding keys to them at the same time.
+    def node(self, cid):
+        """Returns a copy of {"name", "company", "appointment"} for `cid`, or None."""
+        with self._lock:
+            node = self.nodes.get(cid)
+            return dict(node) if node else None
+
+    def manager_of(self, cid):
+        with self._lock:
+            return self.manager.get(cid)
+
+    def companies(self):
+        """Companies with at least one member, sorted."""
+        with self._lock:
+            return sorted((k for k, v in self.by_company.items() if v), key=str)
+
+    def colleagues(self, cid):
+        """Sorted ids of the other members of `cid`'s company."""
+        with self._lock:
+            node = self.nodes.get(cid)
+            return sorted(self.by_company.get(node["company"], set()) - {cid}) if node else []
+
+    def label(self, cid):
+        with self._lock:
+            node = self.nodes.get(cid)
+            return f"{node['name']} ({node['company']})" if node else "N/A"
+
+    def would_cycle(self, cid, manager_id, pending=None):
+        """True if making `manager_id` the manager of `cid` would close a reporting loop.
+
+        `pending` ({id: manager id}) overrides managers changed by a write not yet applied here.
+        """
+        pending = pending or {}
+        with self._lock:
+            seen = set()
+            while manager_id is not None and manager_id not in seen:
+                if manager_id == cid:
+                    return True
+                seen.add(manager_id)
+                manager_id = pending[manager_id] if manager_id in pending else self.manager.get(manager_id)
+            return False
+
+    def cycles(self):
+        """Returns each reporting loop once, as a list of ids."""
+        with self._lock:
+            if "cycles" not in self._cache:
+                state, found = {}, []
+                for start in self.nodes:
+                    path, cid = [], start
+                    while cid is not None and cid not in state:
+                        state[cid] = start
+                        path.append(cid)
+                        cid = self.manager.get(cid)
+                    if cid is not None and state[cid] == start:
+                        found.append(path[path.index(cid):])
+                self._cache["cycles"] = found
+            return self._cache["cycles"]
+
+    def depths(self):
+        """Returns {id: depth} where heads of chain are 0. Members of a loop are left out."""
+        with self._lock:
+            if "depths" not in self._cache:
+                depth = {}
+                in_cycle = {cid for loop in self.cycles() for cid in loop}
+                for start in self.nodes:
+                    path, cid = [], start
+                    while cid is not None and cid not in depth and cid not in in_cycle and cid in self.nodes:
+                        path.append(cid)
+                        cid = self.manager.get(cid)
+                    if cid in in_cycle:
+                        continue
+                    base = depth[cid] + 1 if cid in depth else 0
+                    for i, p in enumerate(reversed(path)):
+                        depth[p] = base + i
+                self._cache["depths"] = depth
+            return self._cache["depths"]
+
+    def tree(self, company):
+        """Returns [(level, id), ...] in display order for one company.
+
+        Roots are members without a manager in the same company; levels are relative to them.
+        """
+        with self._lock:
+            key = ("tree", company)
+            if key not in self._cache:
+                members = self.by_company.get(company, set())
+                in_cycle = {c for loop in self.cycles() for c in loop}
+                roots = sorted((i for i in members if i in in_cycle
+                                or self.nodes.get(self.manager.get(i), {}).get("company") != company),
+                               key=lambda i: (self.nodes[i]["name"] or "", i))
+                out, seen = [], set()
+                stack = [(0, r) for r in reversed(roots)]
+                while stack:
+                    level, cid = stack.pop()
+                    if cid in seen:
+                        continue
+                    seen.add(cid)
+                    out.append((level, cid))
+                    kids = sorted((k for k in self.children.get(cid, ()) if k in members),
+                                  key=lambda i: (self.nodes[i]["name"] or "", i))
+                    stack += [(level + 1, k) for k in reversed(kids)]
+                self._cache[key] = out
+            return self._cache[key]
+
+    def company_stats(self, company):
+        """Returns depth and span-of-control figures for one company."""
+        with self._lock:
+            members = self.by_company.get(company, set())
+            tree = self.tree(company)
+            spans = [len(self.children.get(i, ())) for i in members if self.children.get(i)]
+            return {
+                "headcount": len(members),
+                "levels": max((lvl for lvl, _ in tree), default=-1) + 1,
+                "managers": len(spans),
+                "max_span": max(spans, default=0),
+                "avg_span": round(sum(spans) / len(spans), 1) if spans else 0,
+            }
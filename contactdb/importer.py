@@ -0,0 +1,185 @@
+import pandas as pd
+
+from contactdb.dedupe import DuplicateIndex, merge, merge_fields
+
+# --- 1. COLUMN TYPES ---
+DATE_COLUMNS = ("birthdate", "assumed_date", "retire_date")
+LIST_COLUMNS = ("receptions", "festivities")
+REQUIRED_COLUMNS = ("name", "company")
+DEFAULT_PHOTO = "https://www.w3schools.com/howto/img_avatar.png"
+
+
+def _split_list(series):
+    """Splits "A; B", "A, B" or exported "['A', 'B']" cells into lists, vectorized."""
+    cleaned = series.fillna("").str.replace(r"[\[\]'\"]", "", regex=True).str.strip()
+    return cleaned.str.split(r"\s*[;,|]\s*", regex=True).map(lambda xs: [x for x in xs if x])
+
+
+def _parse_dates(series):
+    """Parses ISO dates in one pass, retrying only the leftovers with format inference."""
+    parsed = pd.to_datetime(series, errors="coerce", format="ISO8601")
+    retry = series.notna() & parsed.isna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(series[retry], errors="coerce", format="mixed", dayfirst=True)
+    return parsed
+
+
+def coerce_chunk(df, columns):
+    """Returns `df` restricted to `columns` with dates parsed and list columns split.
+
+    Also returns the raw text of date cells that were filled in but could not be parsed
+    (None where the cell is fine), so the report can echo what the user typed.
+    """
+    df = df.reindex(columns=columns, fill_value="").astype(object)
+    df = df.apply(lambda s: s.str.strip())
+    df = df.where(~df.isin(["", "nan", "None", "NaT"]), None)
+    bad_dates = pd.DataFrame(None, index=df.index, columns=[c for c in DATE_COLUMNS if c in df], dtype=object)
+    for col in bad_dates.columns:
+        parsed = _parse_dates(df[col])
+        bad_dates[col] = df[col].where(df[col].notna() & parsed.isna(), None)
+        df[col] = pd.Series(parsed.dt.date, index=df.index, dtype=object).where(parsed.notna(), None)
+    for col in LIST_COLUMNS:
+        if col in df:
+            df[col] = _split_list(df[col])
+    return df, bad_dates
+
+
+def validate_chunk(df, bad_dates, allowed, row_offset=0):
+    """Checks a coerced chunk. Returns (valid_mask, errors).
+
+    `allowed` maps a column name to its permitted values (e.g. {"country": COUNTRIES}).
+    Blank cells are accepted; row numbers in errors are 1-based data rows of the file.
+    """
+    errors = []
+    valid = pd.Series(True, index=df.index)
+
+    def flag(mask, field, message, values=None):
+        nonlocal valid
+        values = df[field] if values is None else values
+        for idx in df.index[mask]:
+            errors.append({"row": row_offset + int(idx) + 1, "field": field,
+                           "value": values[idx], "message": message})
+        valid &= ~mask
+
+    for col in REQUIRED_COLUMNS:
+        flag(df[col].isna(), col, "Required field is empty")
+    for col, options in allowed.items():
+        if col in df:
+            flag(df[col].notna() & ~df[col].isin(options), col, f"Must be one of: {', '.join(options)}")
+    for col in bad_dates.columns:
+        flag(bad_dates[col].notna(), col, "Unrecognised date", values=bad_dates[col])
+    errors.sort(key=lambda e: e["row"])
+    return valid, errors
+
+
+# --- 2. PIPELINE ---
+# What to do with a row that looks like an existing contact (or an earlier row of the file).
+MERGE, SKIP, CREATE = "merge", "skip", "create"
+DUPLICATE_ACTIONS = (MERGE, SKIP, CREATE)
+
+
+def _chunks(source, columns, allowed, chunksize):
+    """Yields (row offset, valid records, invalid row count, errors) per chunk of the file."""
+    offset = 0
+    for raw in pd.read_csv(source, chunksize=chunksize, dtype=str, keep_default_na=False):
+        raw.index = range(len(raw))
+        df, bad_dates = coerce_chunk(raw, columns)
+        valid, errors = validate_chunk(df, bad_dates, allowed, row_offset=offset)
+        good = df[valid]
+        rows = [offset + int(i) + 1 for i in good.index]
+        yield rows, good.to_dict("records"), int((~valid).sum()), errors
+        offset += len(raw)
+
+
+def _best_match(dedupe, file_rows, record):
+    """Best duplicate of `record` as (in_file, id, score, reasons), or None.
+
+    Stored contacts come from `dedupe`; `file_rows` indexes the earlier rows of the same file
+    by row number. Ties go to the stored contact.
+    """
+    found = [(False, *m) for m in dedupe.matches(record, limit=1)]
+    found += [(True, *m) for m in file_rows.matches(record, limit=1)]
+    return max(found, key=lambda m: m[2]) if found else None
+
+
+def scan_csv(dedupe, source, columns, allowed, chunksize=5000):
+    """Dry run of `import_csv` that lists the valid rows looking like duplicates. Writes nothing.
+
+    Each entry has the file `row`, its `name` and `company`, the `match` it resembles (a
+    contact label or "Row N of this file"), `match_id` (None for in-file matches), the match
+    `score` and the agreeing fields as `reasons`.
+    """
+    file_rows = DuplicateIndex()
+    found = []
+    for rows, records, _, _ in _chunks(source, columns, allowed, chunksize):
+        for row, r in zip(rows, records):
+            m = _best_match(dedupe, file_rows, r)
+            if m is not None:
+                in_file, key, score, reasons = m
+                found.append({"row": row, "name": r.get("name"), "company": r.get("company"),
+                              "match": f"Row {key} of this file" if in_file else dedupe.label(key),
+                              "match_id": None if in_file else key, "score": round(score, 2),
+                              "reasons": ", ".join(reasons)})
+            file_rows.update([{**r, "id": row}])
+    return found
+
+
+def import_csv(store, source, columns, allowed, user_name, ts, chunksize=5000,
+               dedupe=None, decisions=None, default_action=SKIP, org_graph=None):
+    """Imports a CSV into `store` chunk by chunk and returns a validation report.
+
+    Rows failing validation are skipped and listed in the report; the rest of the file still
+    imports. Each chunk is inserted in one transaction with its ids allocated as a block, so
+    memory stays bounded by `chunksize` regardless of file size.
+
+    With a `dedupe` index, rows resembling a stored contact or an earlier row of the file are
+    merged, skipped or created as `decisions` ({row number: action}) says, else per
+    `default_action`. Merges fill in and refresh fields of the existing contact and are
+    logged field by field as "Import Merge". Given `org_graph`, a merged manager that would
+    create a reporting loop is left unchanged and listed under "loops" in the report.
+    """
+    decisions = decisions or {}
+    report = {"imported": 0, "merged": 0, "duplicates": 0, "skipped": 0, "errors": [], "loops": []}
+    for rows, records, invalid, errors in _chunks(source, columns, allowed, chunksize):
+        report["errors"] += errors
+        report["skipped"] += invalid
+        created, merges, merge_rows = {}, {}, {}
+        file_rows = DuplicateIndex()   # rows created from this chunk; earlier chunks are in `dedupe`
+        for row, r in zip(rows, records):
+            m = _best_match(dedupe, file_rows, r) if dedupe is not None else None
+            action = CREATE if m is None else decisions.get(row, default_action)
+            if action == SKIP:
+                report["duplicates"] += 1
+            elif action == MERGE:
+                in_file, key = m[0], m[1]
+                if in_file:
+                    created[key].update(merge_fields(created[key], r))
+                else:
+                    merges.setdefault(key, {}).update({k: v for k, v in r.items() if v is not None})
+                    if r.get("reporting_to") is not None:
+                        merge_rows[key] = row
+                report["merged"] += 1
+            else:
+                created[row] = r
+                if dedupe is not None:
+                    file_rows.update([{**r, "id": row}])
+        new = list(created.values())
+        for r in new:
+            if r.get("photo") is None and "photo" in columns:
+                r["photo"] = DEFAULT_PHOTO
+            r.update({"last_updated_at": ts, "last_updated_by_name": user_name, "comments": []})
+            for col in LIST_COLUMNS:
+                if r.get(col) is None:
+                    r[col] = []
+        if new or merges:
+            with store.transaction():
+                if new:
+                    ids = store.insert_many(new)
+                    store.audit.append([{"contact_id": cid, "actor": user_name, "msg": "Bulk Import"} for cid in ids])
+                if merges:
+                    _, loops = merge(store, merges, user_name, ts, "Import Merge", graph=org_graph)
+                    report["loops"] += [{"row": merge_rows[cid], "field": "reporting_to", "value": merges[cid]["reporting_to"],
+                                         "message": "Would create a reporting loop; manager left unchanged."}
+                                        for cid in loops]
+        report["imported"] += len(new)
+    return report
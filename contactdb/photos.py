@@ -0,0 +1,92 @@
+import base64
+import hashlib
+import io
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+
+# --- 1. LIMITS & VARIANTS ---
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+# Longest edge in pixels for each stored variant. Thumbnails are 2x the 140px card width.
+VARIANTS = {"thumb": 280, "full": 1600}
+REF_PREFIX = "blob:"
+
+
+class PhotoTooLarge(ValueError):
+    pass
+
+
+# --- 2. BLOB STORE ---
+class PhotoStore:
+    """Content-addressed image store on local disk.
+
+    Uploads are keyed by the SHA-256 of their bytes, so the same picture is stored once no
+    matter how many contacts use it. Records keep only a short `blob:<hash>` reference; the
+    thumbnail and full-size JPEG variants are generated at upload time.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, digest, variant):
+        return os.path.join(self.root, digest[:2], f"{digest}_{variant}.jpg")
+
+    def put(self, data, max_bytes=MAX_UPLOAD_BYTES):
+        """Stores raw image bytes and returns their `blob:` reference.
+
+        Raises PhotoTooLarge over `max_bytes`, and ValueError if the bytes are not an image.
+        """
+        if max_bytes is not None and len(data) > max_bytes:
+            raise PhotoTooLarge(f"Photo is {len(data) / 1e6:.1f} MB; the limit is {max_bytes / 1e6:.0f} MB.")
+        digest = hashlib.sha256(data).hexdigest()
+        if all(os.path.exists(self._path(digest, v)) for v in VARIANTS):
+            return REF_PREFIX + digest
+        try:
+            img = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+            img.load()
+        except Exception as exc:
+            raise ValueError("Unsupported or corrupt image file.") from exc
+        if img.mode != "RGB":
+            # Flatten transparency onto white so PNG cut-outs don't turn black as JPEG.
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, "white")
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        os.makedirs(os.path.dirname(self._path(digest, "thumb")), exist_ok=True)
+        for variant, edge in VARIANTS.items():
+            out = img.copy()
+            out.thumbnail((edge, edge))
+            path = self._path(digest, variant)
+            # A private temp file per write: two sessions may store the same image at once.
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    out.save(f, "JPEG", quality=85, optimize=True)
+                os.replace(tmp, path)
+            except BaseException:
+                os.remove(tmp)
+                raise
+        return REF_PREFIX + digest
+
+    def resolve(self, ref, variant="thumb"):
+        """Returns something `st.image` can show: a file path for blob refs, else `ref` unchanged."""
+        if isinstance(ref, str) and ref.startswith(REF_PREFIX):
+            path = self._path(ref[len(REF_PREFIX):], variant)
+            return path if os.path.exists(path) else None
+        return ref
+
+    def migrate_data_urls(self, store):
+        """Moves photos still embedded as base64 data URLs into the blob store. Returns the count."""
+        rows = store.project(("id", "photo"))
+        ids = [cid for cid, photo in rows if isinstance(photo, str) and photo.startswith("data:")]
+        records = store.get_many(ids)
+        for r in records:
+            try:
+                # Already-stored photos are moved as-is; the upload limit applies to new uploads only.
+                r["photo"] = self.put(base64.b64decode(r["photo"].split(",", 1)[1]), max_bytes=None)
+            except ValueError:
+                r["photo"] = None
+        if records:
+            store.save_many(records)
+        return len(records)
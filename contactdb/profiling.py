@@ -0,0 +1,62 @@
+import threading
+import time
+import tracemalloc
+import weakref
+
+# --- 1. RERUN PROFILER ---
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+
+
+def _start_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0:
+            tracemalloc.stop()
+
+
+class RerunProfiler:
+    """Lap timer for the sections of one script run.
+
+    `mark(name)` closes the running section and starts the next, recording its wall time, the
+    memory it left allocated and its allocation peak (via tracemalloc). Memory tracing is
+    process-wide, so figures include allocations made by other sessions' concurrent reruns.
+    A disabled profiler does nothing, so the marks can stay in the script permanently.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.laps = []       # {"section", "ms", "alloc_kb", "peak_kb"}
+        self._section = None
+        if enabled:
+            _start_tracing()
+            # Also released if the run stops early (st.rerun, st.stop) and `finish` is never reached.
+            self._release = weakref.finalize(self, _stop_tracing)
+
+    def mark(self, section):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._section is not None:
+            self.laps.append({"section": self._section, "ms": round((now - self._started) * 1000, 1),
+                              "alloc_kb": round((current - self._memory) / 1024, 1),
+                              "peak_kb": round((peak - self._memory) / 1024, 1)})
+        tracemalloc.reset_peak()
+        self._section, self._started, self._memory = section, now, current
+
+    def finish(self):
+        """Closes the last section, stops memory tracing and returns the laps."""
+        if self.enabled and self._section is not None:
+            self.mark(None)
+            self._release()
+        return self.laps
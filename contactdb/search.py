@@ -0,0 +1,217 @@
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+# --- 1. FIELDS & TOKENIZING ---
+# Indexed record fields and their ranking weight.
+FIELD_WEIGHTS = {
+    "name": 3.0, "company": 2.0, "appointment": 1.5, "email": 1.5, "mobile": 1.0, "office": 1.0,
+    "country": 1.0, "category": 1.0, "hobbies": 1.0, "dietary": 0.5, "address": 0.5, "spouse": 0.5,
+    "comments": 0.5,
+}
+
+# Scope prefixes accepted in queries, e.g. `company:tech appt:director`.
+FIELD_ALIASES = {
+    "name": "name", "company": "company", "comp": "company", "appt": "appointment",
+    "appointment": "appointment", "email": "email", "mobile": "mobile", "phone": "mobile",
+    "office": "office", "country": "country", "category": "category", "cat": "category",
+    "hobbies": "hobbies", "hobby": "hobbies", "dietary": "dietary", "diet": "dietary",
+    "address": "address", "addr": "address", "spouse": "spouse", "comments": "comments",
+    "comment": "comments",
+}
+
+# Score multipliers for how a query term matched an indexed token.
+EXACT, PREFIX, FUZZY = 1.0, 0.6, 0.35
+
+_WORD = re.compile(r"[0-9a-z]+")
+
+
+def tokenize(text):
+    return _WORD.findall(str(text).lower())
+
+
+def _field_text(record, field):
+    value = record.get(field)
+    if field == "comments":
+        return " ".join(m.get("text", "") for m in value or [])
+    return "" if value is None else str(value)
+
+
+def _record_terms(record):
+    """Returns {(field, token), ...} for a record. Phone fields also index their digit string."""
+    terms = set()
+    for field in FIELD_WEIGHTS:
+        text = _field_text(record, field)
+        terms.update((field, t) for t in tokenize(text))
+        if field in ("mobile", "office"):
+            digits = re.sub(r"\D", "", text)
+            if digits:
+                terms.add((field, digits))
+    return terms
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a, b, limit):
+    """Levenshtein distance, giving up early once every path exceeds `limit`."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        curr = [i]
+        for j, cb in enumerate(b, 1):
+            curr.append(min(prev[j] + 1, curr[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(curr) > limit:
+            return limit + 1
+        prev = curr
+    return prev[-1]
+
+
+# --- 2. INDEX ---
+class SearchIndex:
+    """Token inverted index over the text fields of every contact, with a trigram index over
+    the vocabulary for typo-tolerant lookups.
+
+    Kept current through `ContactStore.subscribe`, so adds, edits, imports and syncs update
+    only the postings of the records they touch.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(set)      # (field, token) -> contact ids
+        self.token_fields = defaultdict(set)  # token -> fields it occurs in
+        self.doc_terms = {}                   # contact id -> {(field, token), ...}
+        self.vocab = []                       # sorted tokens, for prefix lookups
+        self.trigrams = defaultdict(set)      # trigram -> tokens
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, store):
+        index = cls()
+        index.update(store.all())
+        store.subscribe(index.update)
+        return index
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def update(self, records):
+        """(Re)indexes the given records, replacing whatever was indexed for their ids."""
+        with self._lock:
+            added, removed = [], []
+            for r in records:
+                old = self.doc_terms.get(r["id"], set())
+                new = _record_terms(r)
+                for term in old - new:
+                    self._remove(term, r["id"], removed)
+                for term in new - old:
+                    self._add(term, r["id"], added)
+                self.doc_terms[r["id"]] = new
+            self._update_vocab(added, removed)
+
+    def _add(self, term, contact_id, added):
+        field, token = term
+        self.postings[term].add(contact_id)
+        if token not in self.token_fields:
+            added.append(token)
+            for g in _trigrams(token):
+                self.trigrams[g].add(token)
+        self.token_fields[token].add(field)
+
+    def _remove(self, term, contact_id, removed):
+        field, token = term
+        ids = self.postings[term]
+        ids.discard(contact_id)
+        if ids:
+            return
+        del self.postings[term]
+        fields = self.token_fields[token]
+        fields.discard(field)
+        if not fields:
+            del self.token_fields[token]
+            removed.append(token)
+            for g in _trigrams(token):
+                self.trigrams[g].discard(token)
+
+    def _update_vocab(self, added, removed):
+        """Keeps the sorted vocabulary in step. Small edits use bisect; bulk loads re-sort once."""
+        if len(added) + len(removed) > 256:
+            gone = set(removed)
+            self.vocab = sorted([t for t in self.vocab if t not in gone] + added)
+            return
+        for token in removed:
+            del self.vocab[bisect_left(self.vocab, token)]
+        for token in added:
+            insort(self.vocab, token)
+
+    # Lookups
+    def _expand(self, word):
+        """Returns {token: match_weight} for the indexed tokens `word` can stand for."""
+        matches = {}
+        if word in self.token_fields:
+            matches[word] = EXACT
+        # Every token in the prefix range counts: the hits filter the listing, so none may be dropped.
+        i = bisect_left(self.vocab, word)
+        while i < len(self.vocab) and self.vocab[i].startswith(word):
+            matches.setdefault(self.vocab[i], PREFIX)
+            i += 1
+        if len(word) >= 4 and not matches:
+            limit = 1 if len(word) < 7 else 2
+            grams = _trigrams(word)
+            counts = defaultdict(int)
+            for g in grams:
+                for token in self.trigrams.get(g, ()):
+                    counts[token] += 1
+            for token, shared in counts.items():
+                if shared * 2 >= len(grams) and _edit_distance(word, token, limit) <= limit:
+                    matches[token] = FUZZY
+        return matches
+
+    def _term_scores(self, field, word):
+        """Returns {contact_id: score} for one query term, optionally scoped to `field`."""
+        scores = defaultdict(float)
+        n_docs = max(len(self.doc_terms), 1)
+        for token, weight in self._expand(word).items():
+            fields = [field] if field else self.token_fields.get(token, ())
+            for f in fields:
+                ids = self.postings.get((f, token))
+                if not ids:
+                    continue
+                idf = math.log(1 + n_docs / len(ids))
+                gain = weight * FIELD_WEIGHTS[f] * idf
+                for cid in ids:
+                    if gain > scores[cid]:
+                        scores[cid] = gain
+        return scores
+
+    def search(self, query, limit=None):
+        """Returns [(contact_id, score), ...] best first. Every term must match (AND).
+
+        Terms may be scoped with a field prefix (`company:tech appt:director`); bare terms
+        match any field. Each term matches exactly, as a prefix, or within a small edit
+        distance when nothing closer exists.
+        """
+        with self._lock:
+            terms = []
+            for part in query.lower().split():
+                field, sep, text = part.partition(":")
+                scope = FIELD_ALIASES.get(field) if sep else None
+                if scope is None:
+                    text = part
+                terms += [(scope, w) for w in tokenize(text)]
+            if not terms:
+                return []
+
+            # Evaluate the most selective term first and intersect from there.
+            per_term = sorted((self._term_scores(f, w) for f, w in terms), key=len)
+            total = dict(per_term[0])
+            for scores in per_term[1:]:
+                total = {cid: s + scores[cid] for cid, s in total.items() if cid in scores}
+                if not total:
+                    return []
+            ranked = sorted(total.items(), key=lambda kv: (-kv[1], kv[0]))
+            return ranked[:limit] if limit else ranked
@@ -0,0 +1,384 @@
+import json
+from abc import ABC, abstractmethod
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import date
+
+from contactdb.audit import AuditLog
+
+# --- 1. RECORD SERIALIZATION ---
+DATE_FIELDS = ("birthdate", "assumed_date", "retire_date")
+
+# Columns pulled out of the JSON payload so they can be indexed and filtered in SQL.
+INDEXED_FIELDS = ("name", "company", "country", "category")
+# Number of recent write batches kept for `changes_since`.
+FEED_LENGTH = 1000
+
+
+class StaleRecord(ValueError):
+    """Raised by a checked write when a record changed since the caller read it."""
+
+    def __init__(self, ids):
+        super().__init__(f"Changed by someone else since it was loaded: {sorted(ids)}")
+        self.ids = ids
+
+
+def three_way_merge(base, current, edited):
+    """Merges a form edit made against `base` onto the `current` record.
+
+    Returns (changes, conflicts): the fields the editor changed relative to `base`, and those
+    of them someone else also changed to a different value since `base` was read. Values are
+    compared as text, the way form widgets return them.
+    """
+    changes = {k: v for k, v in edited.items() if str(base.get(k)) != str(v)}
+    theirs = {k for k in edited if str(base.get(k)) != str(current.get(k))}
+    conflicts = [k for k in changes if k in theirs and str(current.get(k)) != str(changes[k])]
+    return changes, conflicts
+
+
+def _encode(record):
+    """Serializes a contact dict to JSON, writing date fields as ISO strings."""
+    payload = dict(record)
+    payload.pop("version", None)
+    for k in DATE_FIELDS:
+        if isinstance(payload.get(k), date):
+            payload[k] = payload[k].isoformat()
+    return json.dumps(payload, default=str)
+
+
+def _decode(raw, version=None):
+    """Inverse of _encode: restores date fields to `date` objects and attaches the row version."""
+    record = json.loads(raw)
+    if version is not None:
+        record["version"] = version
+    for k in DATE_FIELDS:
+        v = record.get(k)
+        if isinstance(v, str) and v:
+            try:
+                record[k] = date.fromisoformat(v[:10])
+            except ValueError:
+                pass
+    return record
+
+
+def _index_row(record):
+    """Returns the indexed column values for a record, in schema order."""
+    bday = record.get("birthdate")
+    has_bday = isinstance(bday, date)
+    return (
+        *(record.get(k) for k in INDEXED_FIELDS),
+        bday.month if has_bday else None,
+        bday.day if has_bday else None,
+    )
+
+
+# --- 2. REPOSITORY INTERFACE ---
+class ContactStore(ABC):
+    """Repository API used by the app. Backends implement the abstract methods."""
+
+    def __init__(self):
+        self._listeners = []
+        self._lock = threading.RLock()
+        self.revision = 0
+        self._feed = deque(maxlen=FEED_LENGTH)  # (revision, ids written, origin)
+        self._local = threading.local()
+        self._queued = None                     # notifications held until the outer COMMIT
+
+    @abstractmethod
+    def get(self, contact_id):
+        pass
+
+    @abstractmethod
+    def get_many(self, contact_ids):
+        pass
+
+    def project(self, fields):
+        """Returns a tuple of the record `fields` for every contact, in id order.
+
+        Lets the derived indexes load only what they need instead of whole records. Backends
+        may return date fields as ISO strings.
+        """
+        return [tuple(r.get(f) for f in fields) for r in self.all()]
+
+    @abstractmethod
+    def insert(self, record):
+        pass
+
+    @abstractmethod
+    def insert_many(self, records):
+        pass
+
+    @abstractmethod
+    def update(self, contact_id, changes):
+        pass
+
+    @abstractmethod
+    def bulk_update(self, contact_ids, changes):
+        pass
+
+    @abstractmethod
+    def save_many(self, records, check=False):
+        pass
+
+    @abstractmethod
+    def count(self):
+        pass
+
+    @abstractmethod
+    def all(self):
+        """Returns every record, in id order."""
+
+    @abstractmethod
+    def transaction(self):
+        """Context manager grouping writes into one atomic step; nested uses join the outer one."""
+
+    def subscribe(self, listener):
+        """Registers `listener(records)`, called with the full records after every committed write.
+
+        Derived indexes (search, birthdays, hierarchy, ...) use this to stay current
+        incrementally instead of being rebuilt from the whole table.
+        """
+        self._listeners.append(listener)
+
+    def _notify(self, records):
+        # Called with the store lock held, so listeners see writes in commit order. Inside a
+        # transaction the records are held back until it commits and dropped if it rolls back.
+        if self._queued is not None:
+            self._queued.append([dict(r) for r in records])
+            return
+        self._deliver(records)
+
+    def _end_queue(self, committed):
+        queued, self._queued = self._queued, None
+        if committed:
+            for records in queued:
+                self._deliver(records)
+
+    def _deliver(self, records):
+        self.revision += 1
+        origin = getattr(self._local, "origin", None)
+        self._feed.append((self.revision, frozenset(r["id"] for r in records), origin))
+        for listener in self._listeners:
+            listener(records)
+
+    def set_origin(self, origin):
+        """Tags the writes made from the current thread (one Streamlit script run) with `origin`."""
+        self._local.origin = origin
+
+    def changes_since(self, revision, exclude_origin=None):
+        """Returns (current revision, ids written after `revision` by other origins).
+
+        The ids are None when `revision` is None or older than the feed reaches back. Sessions
+        keep the revision they last rendered and use this to spot cards changed by someone else.
+        """
+        with self._lock:
+            if revision is None or (self._feed and self._feed[0][0] > revision + 1):
+                return self.revision, None
+            changed = set()
+            for rev, ids, origin in reversed(self._feed):
+                if rev <= revision:
+                    break
+                if origin is None or origin != exclude_origin:
+                    changed |= ids
+            return self.revision, changed
+
+    def __len__(self):
+        return self.count()
+
+
+# --- 3. SQLITE BACKEND ---
+class SQLiteContactStore(ContactStore):
+    """SQLite-backed store (WAL mode on disk) with indexes on the filterable fields.
+
+    Each contact is kept as a JSON payload alongside indexed copies of the fields the app
+    filters and sorts on, so lookups by id, company, country, category, name or birth
+    month never need a full scan. Every write bumps the row's `version`, which reads expose
+    as `record["version"]` for optimistic concurrency (`save_many(..., check=True)`).
+
+    One instance is safe to share between threads (all Streamlit sessions use the same one).
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            company TEXT,
+            country TEXT,
+            category TEXT,
+            birth_month INTEGER,
+            birth_day INTEGER,
+            data TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE INDEX IF NOT EXISTS ix_contacts_name ON contacts(name COLLATE NOCASE);
+        CREATE INDEX IF NOT EXISTS ix_contacts_company ON contacts(company);
+        CREATE INDEX IF NOT EXISTS ix_contacts_country ON contacts(country);
+        CREATE INDEX IF NOT EXISTS ix_contacts_category ON contacts(category);
+        CREATE INDEX IF NOT EXISTS ix_contacts_birth ON contacts(birth_month, birth_day);
+    """
+
+    def __init__(self, path=":memory:"):
+        super().__init__()
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        if "version" not in {r[1] for r in self._conn.execute("PRAGMA table_info(contacts)")}:
+            self._conn.execute("ALTER TABLE contacts ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        self.audit = AuditLog(self._conn, self._lock)
+
+    # Reads
+    def get(self, contact_id):
+        with self._lock:
+            row = self._conn.execute("SELECT data, version FROM contacts WHERE id = ?", (contact_id,)).fetchone()
+        return _decode(*row) if row else None
+
+    def get_many(self, contact_ids):
+        contact_ids = list(contact_ids)
+        if not contact_ids:
+            return []
+        found = {}
+        with self._lock:
+            # Chunk to stay under SQLite's bound-parameter limit.
+            for i in range(0, len(contact_ids), 900):
+                chunk = contact_ids[i:i + 900]
+                marks = ",".join("?" * len(chunk))
+                for cid, raw, version in self._conn.execute(
+                        f"SELECT id, data, version FROM contacts WHERE id IN ({marks})", chunk):
+                    found[cid] = (raw, version)
+        return [_decode(*found[cid]) for cid in contact_ids if cid in found]
+
+    def all(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT data, version FROM contacts ORDER BY id").fetchall()
+        return [_decode(*r) for r in rows]
+
+    def project(self, fields):
+        # Indexed fields come from their columns. The rest are read from the JSON payload in one
+        # multi-path json_extract per row, which returns them as a JSON array (lists intact).
+        columns = [f for f in fields if f in ("id", "version", *INDEXED_FIELDS)]
+        nested = [f for f in fields if f not in columns]
+        paths = [f"$.{f}" for f in nested]
+        if len(paths) == 1:
+            paths *= 2   # a single path would return the bare value, not an array
+        sql = "SELECT " + ", ".join(columns + [f"json_extract(data, {', '.join('?' * len(paths))})"] * bool(nested))
+        with self._lock:
+            rows = self._conn.execute(sql + " FROM contacts ORDER BY id", paths).fetchall()
+        if not nested:
+            return rows
+        rows = [r[:-1] + tuple(json.loads(r[-1])[:len(nested)]) for r in rows]
+        if list(fields) == columns + nested:
+            return rows
+        order = [(columns + nested).index(f) for f in fields]
+        return [tuple(row[i] for i in order) for row in rows]
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    # Writes
+    def insert(self, record):
+        """Inserts one record, allocating an id when the record has none. Returns the id."""
+        return self.insert_many([record])[0]
+
+    def insert_many(self, records):
+        """Inserts records in one transaction, allocating missing ids as a single block."""
+        records = list(records)
+        with self._lock:
+            next_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM contacts").fetchone()[0] + 1
+            ids = []
+            for r in records:
+                if r.get("id") is None:
+                    r["id"] = next_id
+                    next_id += 1
+                else:
+                    next_id = max(next_id, r["id"] + 1)
+                r["version"] = 1
+                ids.append(r["id"])
+            with self.transaction():
+                self._conn.executemany(
+                    "INSERT INTO contacts (id, name, company, country, category, birth_month, birth_day, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    ((r["id"], *_index_row(r), _encode(r)) for r in records),
+                )
+            self._notify(records)
+        return ids
+
+    def update(self, contact_id, changes):
+        """Applies `changes` to one record and returns the updated record (None if missing)."""
+        updated = self.bulk_update([contact_id], changes)
+        return updated[0] if updated else None
+
+    def bulk_update(self, contact_ids, changes):
+        """Applies the same `changes` to every listed record in one transaction."""
+        with self._lock:
+            with self.transaction():
+                records = self.get_many(contact_ids)
+                for r in records:
+                    r.update(changes)
+                self._write(records)
+            self._notify(records)
+        return records
+
+    def save_many(self, records, check=False):
+        """Writes back whole records (already modified by the caller) in one transaction.
+
+        With `check`, records carrying a `version` are only written if nobody else has saved
+        them since they were read; otherwise StaleRecord is raised and nothing is written.
+        """
+        with self._lock:
+            with self.transaction():
+                self._write(records, check)
+            self._notify(records)
+
+    @contextmanager
+    def transaction(self):
+        """Groups writes (including audit events) into one atomic step. Nested uses join the outer one."""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield
+                return
+            # IMMEDIATE takes the write lock up front, so other processes on the same file queue
+            # instead of failing part-way through.
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._queued = []
+            try:
+                yield
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._end_queue(committed=False)
+                raise
+            self._end_queue(committed=True)
+
+    def _write(self, records, check=False):
+        current = dict(self._conn.execute(
+            "SELECT id, version FROM contacts WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps([r["id"] for r in records]),)))
+        if check:
+            stale = [r["id"] for r in records if r.get("version") is not None and current.get(r["id"]) != r["version"]]
+            if stale:
+                raise StaleRecord(stale)
+        for r in records:
+            r["version"] = current.get(r["id"], 0) + 1
+        self._conn.executemany(
+            "UPDATE contacts SET name = ?, company = ?, country = ?, category = ?, birth_month = ?, "
+            "birth_day = ?, data = ?, version = ? WHERE id = ?",
+            ((*_index_row(r), _encode(r), r["version"], r["id"]) for r in records),
+        )
+
+
+# --- 4. FACTORY ---
+def open_store(path=":memory:", seed=None):
+    """Opens the configured backend and seeds it when empty.
+
+    `seed` is a callable returning the initial records, so it only runs on first use.
+    """
+    store = SQLiteContactStore(path)
+    if seed is not None and store.count() == 0:
+        store.insert_many(seed())
+    return store
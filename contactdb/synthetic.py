@@ -0,0 +1,137 @@
+import base64
+import io
+import random
+from datetime import date, datetime, timedelta
+
+from PIL import Image
+
+# --- 1. VOCABULARY ---
+# Field values mirror the app's option lists so generated contacts pass import validation.
+COUNTRIES = {
+    "Singapore": ("+65", "Marina Boulevard, Singapore"), "Malaysia": ("+60", "Jalan Ampang, Kuala Lumpur"),
+    "USA": ("+1", "Fifth Avenue, New York"), "UK": ("+44", "Canary Wharf, London"),
+    "Australia": ("+61", "George Street, Sydney"), "Japan": ("+81", "Marunouchi, Tokyo"),
+    "China": ("+86", "Lujiazui, Shanghai"), "India": ("+91", "Nariman Point, Mumbai"),
+}
+CATEGORIES = ["Chief", "Deputy Chief", "Overseas", "Local", "Others"]
+TIERS = ["A", "B", "C", "D"]
+FESTIVITIES = ["Chinese New Year", "Hari Raya", "Deepavali", "Christmas", "National Day"]
+RECEPTIONS = ["ALSE", "NYR", "BigShow", "National Day"]
+MARITAL_STATUSES = ["Single", "Married", "Divorced", "Widowed"]
+DIETARY = [None, None, None, "Halal", "Vegetarian", "No Beef", "Gluten Free"]
+HOBBIES = ["Golf", "Wine Tasting", "Hiking", "Reading", "Tennis", "Photography", "Cycling", "Sailing"]
+PHOTOS = ["https://www.w3schools.com/howto/img_avatar.png", "https://www.w3schools.com/howto/img_avatar2.png"]
+# Edge in pixels of the generated embedded photos (legacy uploads stored as data URLs).
+PHOTO_EDGE = 96
+
+GIVEN = ["Wei", "Ming", "Jun", "Hui", "Mei", "Ling", "Ahmad", "Siti", "Nur", "Aziz", "Raj", "Priya", "Arun",
+         "Kavita", "James", "Sarah", "David", "Emma", "John", "Grace", "Kenji", "Yuki", "Hiro", "Aiko",
+         "Chen", "Li", "Xin", "Yan", "Oliver", "Sophie", "Daniel", "Chloe", "Ravi", "Anita", "Farid", "Aisha",
+         "Boon", "Hock", "Teck", "Kiat", "Michael", "Rachel", "Thomas", "Hannah", "Vikram", "Meera", "Hamid",
+         "Zara", "Kai", "Lena", "Marcus", "Irene", "Samuel", "Joyce", "Ethan", "Nadia", "Victor", "Clara",
+         "Adrian", "Fiona"]
+SURNAMES = ["Tan", "Lim", "Lee", "Ng", "Wong", "Goh", "Chua", "Ong", "Koh", "Teo", "Rahman", "Ismail",
+            "Hassan", "Kumar", "Singh", "Nair", "Pillai", "Smith", "Jones", "Brown", "Taylor", "Wilson",
+            "Sato", "Suzuki", "Tanaka", "Chen", "Wang", "Zhang", "Liu", "Yeo", "Low", "Ho", "Sim", "Chan",
+            "Patel", "Shah", "Murphy", "Clarke", "Walker", "Young"]
+COMPANY_WORDS = ["Global", "Pacific", "Summit", "Harbour", "Lion", "Orchid", "Meridian", "Apex", "Crescent",
+                 "Everest", "Keystone", "Silverline", "Northstar", "Bluewater", "Red Dot", "Golden Gate"]
+COMPANY_KINDS = ["Corp Group", "Holdings", "Capital", "Logistics", "Technologies", "Bank", "Energy",
+                 "Healthcare", "Ventures", "Industries"]
+# Appointment titles by depth in a company's reporting chain.
+APPOINTMENTS = ["Group Chairman", "Chief Executive Officer", "Managing Director", "Director",
+                "Senior Manager", "Manager", "Executive"]
+HISTORY_MSGS = ["Initial Entry", "Profile Updated", "Tier Reviewed", "Contact Details Updated",
+                "Bulk Import", "Category Changed", "Photo Updated"]
+COMMENTS = ["Met at the annual dinner.", "Prefers morning meetings.", "Follow up on the partnership proposal.",
+            "Sent festive hamper.", "Introduced by the regional office.", "Attending the next reception."]
+# App users credited with history entries and comments.
+STAFF = ["System", "Alex Tan", "Priya Nair", "Daniel Lee", "Siti Rahman"]
+TS_FORMAT = "%d %b %y, %H:%M"
+
+
+# --- 2. GENERATOR ---
+def _names(rng, n):
+    """`n` distinct "Given Given Surname" names, so reporting lines resolve by name."""
+    space = len(GIVEN) * len(GIVEN) * len(SURNAMES)
+    if n > space:
+        raise ValueError(f"Can generate at most {space} distinct names.")
+    names = []
+    for k in rng.sample(range(space), n):
+        k, s = divmod(k, len(SURNAMES))
+        g1, g2 = divmod(k, len(GIVEN))
+        names.append(f"{GIVEN[g1]} {GIVEN[g2]} {SURNAMES[s]}")
+    return names
+
+
+def _data_url(rng):
+    """A small JPEG of random pixels as a base64 data URL, distinct per call so none dedupe."""
+    img = Image.frombytes("RGB", (PHOTO_EDGE, PHOTO_EDGE), rng.randbytes(PHOTO_EDGE * PHOTO_EDGE * 3))
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=80)
+    return "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode()
+
+
+def _ts(rng, start, days):
+    return start + timedelta(days=rng.uniform(0, days))
+
+
+def generate_contacts(n, seed=0, company_size=50, span=5, history=20, comments=5, embedded_photos=0.2, today=None):
+    """Returns `n` contact dicts shaped like the app's seed data, reproducible per `seed`.
+
+    Contacts are grouped into companies of about `company_size`; each company is one reporting
+    chain headed by a chairman, where every manager has up to `span` direct reports. Each
+    record carries up to `history` legacy history entries and `comments` comments (the actual
+    counts vary per contact, averaging half). A share `embedded_photos` of the contacts carry a
+    legacy base64 photo for the photo store to migrate; the rest use the avatar URLs.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    start = datetime.combine(today - timedelta(days=5 * 365), datetime.min.time())
+    names = _names(rng, n)
+    companies = [f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_KINDS)} {i + 1}"
+                 for i in range(max(1, -(-n // company_size)))]
+    contacts = []
+    for i, name in enumerate(names):
+        company_no, pos = divmod(i, company_size)
+        company = companies[company_no]
+        country = rng.choice(list(COUNTRIES))
+        dial, street = COUNTRIES[country]
+        # Position `pos` reports to `(pos - 1) // span`: a balanced chain of depth log_span(size).
+        manager = None if pos == 0 else contacts[company_no * company_size + (pos - 1) // span]
+        depth, level = 0, pos
+        while level:
+            level, depth = (level - 1) // span, depth + 1
+        birthdate = today - timedelta(days=rng.randint(25 * 365, 70 * 365))
+        assumed = today - timedelta(days=rng.randint(30, 15 * 365))
+        married = rng.random() < 0.7
+        golfer = rng.random() < 0.3
+        stamps = sorted(_ts(rng, start, 5 * 365) for _ in range(rng.randint(0, history)))
+        entries = [{"ts": t.strftime(TS_FORMAT), "user": rng.choice(STAFF), "msg": rng.choice(HISTORY_MSGS)}
+                   for t in stamps]
+        first, last = name.split()[0].lower(), name.split()[-1].lower()
+        contacts.append({
+            "id": i + 1, "name": name, "birthdate": birthdate, "company": company,
+            "appointment": APPOINTMENTS[min(depth, len(APPOINTMENTS) - 1)], "country": country,
+            "mobile": f"{dial} 9{rng.randint(0, 9999999):07d}", "office": f"{dial} 6{rng.randint(0, 9999999):07d}",
+            "email": f"{first}.{last}{i + 1}@{company.split()[0].lower()}.com",
+            "address": f"{rng.randint(1, 200)} {street}", "hobbies": rng.choice(HOBBIES),
+            "dietary": rng.choice(DIETARY), "receptions": rng.sample(RECEPTIONS, rng.randint(0, 2)),
+            "festivities": rng.sample(FESTIVITIES, rng.randint(0, 2)), "assumed_date": assumed,
+            "retire_date": None if rng.random() < 0.9 else assumed + timedelta(days=rng.randint(365, 3650)),
+            "marital_status": "Married" if married else rng.choice([m for m in MARITAL_STATUSES if m != "Married"]),
+            "spouse": rng.choice(GIVEN) + " " + name.split()[-1] if married else None,
+            "children": str(rng.randint(0, 4)) if married else "0",
+            "reporting_to": manager["name"] if manager else None,
+            "vehicle_reg": f"S{rng.choice('ABCDEFGHJK')}{rng.randint(1, 9999)}", "golf": "Yes" if golfer else "No",
+            "handicap": str(rng.randint(0, 36)) if golfer else None,
+            "status": "Active" if rng.random() < 0.9 else "Inactive",
+            "category": CATEGORIES[min(depth, len(CATEGORIES) - 1)] if depth < 2 else rng.choice(CATEGORIES[2:]),
+            "tier": TIERS[min(depth, len(TIERS) - 1)],
+            "photo": _data_url(rng) if rng.random() < embedded_photos else rng.choice(PHOTOS),
+            "last_updated_by_name": "System", "last_updated_at": entries[-1]["ts"] if entries else start.strftime(TS_FORMAT),
+            "history": entries,
+            "comments": [{"user_name": rng.choice(STAFF[1:]), "text": rng.choice(COMMENTS)}
+                         for _ in range(rng.randint(0, comments))],
+        })
+    return contacts
@@ -1,13 +1,34 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import pandas as pd
 from datetime import date, datetime, timedelta
 import io
-import base64
+import os
+import calendar
+import json
+import uuid
+from itertools import islice
+from contactdb import StaleRecord, batch, dedupe, open_store, three_way_merge
+from contactdb.importer import DUPLICATE_ACTIONS, import_csv, scan_csv
+from contactdb.search import SearchIndex
+from contactdb.hierarchy import OrgGraph
+from contactdb.columnar import ContactFrame
+from contactdb.facets import FACET_FIELDS, LIST_FIELDS, FacetCounts
+from contactdb.birthdays import BirthdayIndex, days_window, months_window, to_ics, week_window
+from contactdb.photos import PhotoStore
+from contactdb.export import EXPORT_FORMATS, available_formats, iter_frames, write_export
+from contactdb.audit import SG_TZ, describe, format_ts, migrate_record_history
+from contactdb.profiling import RerunProfiler
+
+# Opt-in per-section wall time and memory for this rerun, switched on from the sidebar.
+profiler = RerunProfiler(enabled=st.session_state.get('profile_reruns', False))
 
 # --- 1. PAGE CONFIGURATION ---
+profiler.mark("1. Page configuration")
 st.set_page_config(page_title="Unified Contact Database", layout="wide")
 
 # --- 2. HELPERS (TIMEZONE, AGE & IMAGE PROCESSING) ---
+profiler.mark("2. Helpers")
 def get_sg_time():
     """Returns current Singapore time (UTC+8)."""
     return datetime.utcnow() + timedelta(hours=8)
@@ -20,23 +41,66 @@ def calculate_age(birthdate):
     return today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
 
 def process_uploaded_image(uploaded_file):
-    """Converts a JPG/PNG/JPEG file to a Base64 string for persistent storage."""
+    """Stores a JPG/PNG/JPEG upload in the photo store and returns its `blob:` reference.
+
+    Raises ValueError (with a user-facing message) for oversized or unreadable files.
+    """
     if uploaded_file is not None:
-        bytes_data = uploaded_file.getvalue()
-        base64_str = base64.b64encode(bytes_data).decode()
-        return f"data:image/jpeg;base64,{base64_str}"
+        return photo_store.put(uploaded_file.getvalue())
     return None
 
+def set_listing_page(page):
+    """Button callback for the listing pager."""
+    st.session_state.list_page = page
+
+def set_audit_page(contact_id, page):
+    """Button callback for paging a card's audit history."""
+    st.session_state[f"audit_pg_{contact_id}"] = page
+
+def jump_to_contact(contact_id, position, page_size):
+    """Moves the listing to the page holding the contact and scrolls to its card after the rerun."""
+    st.session_state.list_page = position // page_size
+    st.session_state.scroll_to = f"contact_{contact_id}"
+
+def rerun_after_write(card_id, written_ids, fields):
+    """Reruns just the card's fragment unless the write shows up elsewhere on the page.
+
+    That is the case when another card on this page was written, or a field in PAGE_FIELDS
+    (listing order, group headers, birthday banner, hierarchy) changed.
+    """
+    others_on_page = (set(written_ids) - {card_id}) & page_ids
+    if others_on_page or PAGE_FIELDS & set(fields):
+        st.rerun()
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # Fragment-scoped reruns are only allowed while the fragment itself is rerunning.
+        st.rerun()
+
+def create_contact(record):
+    """Inserts a contact entered by hand and logs its creation. Returns the new id."""
+    with store.transaction():
+        new_id = store.insert(record)
+        store.audit.append([{"contact_id": new_id, "actor": user['name'], "msg": "Manual Creation"}])
+    return new_id
+
+def facet_frame(field, limit=None):
+    """A field's breakdown from the facet counters, as a two-column frame for display."""
+    rows = [("Not set" if v is None else v, n) for v, n in facets.breakdown(field, limit)]
+    return pd.DataFrame(rows, columns=[SUMMARY_FIELDS[field], "Contacts"])
+
 def get_current_user():
     """Simulated Production User Object."""
     if 'user_info' not in st.session_state:
         st.session_state.user_info = {"email": "admin@company.com", "name": "Alex Tan", "role": "Admin"}
     return st.session_state.user_info
 
-# --- 3. SESSION STATE INITIALIZATION & MULTI-COMPANY SAMPLE DATA ---
-if 'contacts_db' not in st.session_state:
+# --- 3. CONTACT STORE & MULTI-COMPANY SAMPLE DATA ---
+profiler.mark("3. Contact store")
+def seed_contacts():
+    """Sample records written to the store the first time it is opened."""
     ts_now = get_sg_time().strftime("%d %b %y, %H:%M")
-    st.session_state.contacts_db = [
+    return [
         {
             "id": 1, "name": "Lim Boon Hock", "birthdate": date(1960, 1, 5), "company": "Global Corp Group",
             "appointment": "Group Chairman", "country": "Singapore", "mobile": "+65 9000 1111", "office": "+65 6111 2222",
@@ -70,7 +134,27 @@ if 'contacts_db' not in st.session_state:
         }
     ]
 
+@st.cache_resource
+def open_shared_data():
+    """One store and one set of derived indexes per server process, shared by every session."""
+    photos = PhotoStore(os.environ.get("CONTACTS_PHOTO_DIR", "photos"))
+    shared = open_store(os.environ.get("CONTACTS_DB_PATH", "contacts.db"), seed=seed_contacts)
+    photos.migrate_data_urls(shared)
+    migrate_record_history(shared)
+    return (photos, shared, SearchIndex.from_store(shared), OrgGraph.from_store(shared),
+            BirthdayIndex.from_store(shared), dedupe.DuplicateIndex.from_store(shared), FacetCounts.from_store(shared))
+
+photo_store, store, search_index, org_graph, bday_index, dup_index, facets = open_shared_data()
+# Writes from this run are tagged with the session, so the change feed can tell our own edits
+# from other sessions'. `changed_elsewhere` holds the contacts others saved since our last run.
+store.set_origin(st.session_state.setdefault('session_id', uuid.uuid4().hex))
+st.session_state.seen_rev, changed_elsewhere = store.changes_since(st.session_state.get('seen_rev'), st.session_state.session_id)
+changed_elsewhere = changed_elsewhere or set()
+# Persist any manager names resolved to ids since the last run (legacy rows, imports).
+org_graph.flush(store)
+
 # --- 4. DATA CONSTANTS ---
+profiler.mark("4. Data constants")
 CATEGORIES = ["Chief", "Deputy Chief", "Overseas", "Local", "Others"]
 CAT_PRIORITY = {"Chief": 1, "Deputy Chief": 2, "Overseas": 3, "Local": 4, "Others": 5}
 STATUS_OPTIONS = ["Active", "Inactive"]
@@ -79,12 +163,34 @@ TIERS = ["A", "B", "C", "D"]
 FESTIVITIES = ["Chinese New Year", "Hari Raya", "Deepavali", "Christmas", "National Day"]
 RECEPTIONS = ["ALSE", "NYR", "BigShow", "National Day"]
 MARITAL_STATUSES = ["Single", "Married", "Divorced", "Widowed"]
+PAGE_SIZES = [10, 25, 50, 100]
+DEFAULT_PHOTO = "https://www.w3schools.com/howto/img_avatar.png"
+AUDIT_PAGE_SIZE = 10
+BDAY_WINDOWS = ["3-Month Outlook", "Next 30 Days", "This Month", "This Week"]
+# Birthday cards drawn per month column; a busy month lists the remainder as a count.
+BDAY_CARDS_PER_MONTH = 8
+SYNC_FIELDS = {"address": "Office Address", "office": "Office No.", "tier": "Tiering", "category": "Category",
+               "status": "Status", "festivities": "Festivities", "receptions": "Receptions"}
+# Fields shown outside a contact's own card (listing, tree, birthdays, sidebar counts, summary,
+# headcounts); writing any of them reruns the whole page.
+PAGE_FIELDS = {"name", "birthdate", "appointment", "reporting_to", "reporting_to_id", *FACET_FIELDS, *LIST_FIELDS}
+# Bulk sync scopes, each a function of the source contact returning a colleague predicate.
+SYNC_SCOPES = {
+    "Same company": lambda src: None,
+    "Same company & country": lambda src: lambda r: r.get('country') == src.get('country'),
+    "Same company & tier": lambda src: lambda r: r.get('tier') == src.get('tier'),
+}
+CONTACT_FIELDS = list(seed_contacts()[0].keys())
+SUMMARY_FIELDS = {"country": "Country", "category": "Category", "tier": "Tier", "status": "Status",
+                  "golf": "Golf", "dietary": "Dietary", "company": "Company"}
 
 # --- 5. AUTHENTICATION ---
+profiler.mark("5. Authentication")
 user = get_current_user()
 IS_ADMIN = user['role'] == "Admin"
 
 # --- 6. SIDEBAR: SEARCH, BULK & INDIVIDUAL ENTRY ---
+profiler.mark("6. Sidebar")
 with st.sidebar:
     st.title("👤 User Profile")
     st.markdown(f"### Welcome, **{user['name']}**")
@@ -94,31 +200,62 @@ with st.sidebar:
     if test_role != IS_ADMIN:
         st.session_state.user_info['role'] = "Admin" if test_role else "User"
         st.rerun()
+    st.toggle("Profile Reruns", key="profile_reruns", help="Times each section of the page and traces its memory. Slows reruns down while on.")
 
     if IS_ADMIN:
         st.divider()
         st.header("📥 Bulk Import")
         # Template Generator
-        all_keys = list(st.session_state.contacts_db[0].keys())
         exclude = ['id', 'history', 'comments', 'last_updated_at', 'last_updated_by_name']
-        template_cols = [k for k in all_keys if k not in exclude]
+        template_cols = [k for k in CONTACT_FIELDS if k not in exclude]
         template_df = pd.DataFrame(columns=template_cols)
         csv_template = template_df.to_csv(index=False)
         st.download_button("📂 Download CSV Template", data=csv_template, file_name="contact_template.csv", mime="text/csv")
         
         uploaded_csv = st.file_uploader("Upload CSV Data", type="csv")
         if uploaded_csv:
-            df_up = pd.read_csv(uploaded_csv)
+            allowed = {"country": COUNTRIES, "category": CATEGORIES, "tier": TIERS}
+            # Duplicate preview: scanned once per uploaded file, then reviewed row by row.
+            if st.session_state.get('import_scan', (None,))[0] != uploaded_csv.file_id:
+                with st.spinner("Checking for existing contacts..."):
+                    uploaded_csv.seek(0)
+                    st.session_state.import_scan = (uploaded_csv.file_id, scan_csv(dup_index, uploaded_csv, template_cols, allowed))
+            dupes = st.session_state.import_scan[1]
+            dup_default = DUPLICATE_ACTIONS[1]
+            decisions = {}
+            if dupes:
+                st.warning(f"⚠️ {len(dupes)} rows look like existing contacts.")
+                dup_default = st.selectbox("For duplicates", DUPLICATE_ACTIONS, format_func=str.title)
+                preview = pd.DataFrame(dupes).drop(columns="match_id").assign(action=dup_default)
+                edited = st.data_editor(
+                    preview, hide_index=True, key=f"dup_edit_{uploaded_csv.file_id}",
+                    disabled=[c for c in preview.columns if c != "action"],
+                    column_config={"action": st.column_config.SelectboxColumn("Action", options=DUPLICATE_ACTIONS, required=True)})
+                decisions = dict(zip(edited["row"].tolist(), edited["action"].tolist()))
+            else:
+                st.caption("No duplicates of existing contacts found.")
             if st.button("Confirm Bulk Import"):
                 ts = get_sg_time().strftime("%d %b %y, %H:%M")
-                for _, row in df_up.iterrows():
-                    new_id = max([x['id'] for x in st.session_state.contacts_db], default=0) + 1
-                    entry = {k: (row[k] if k in row else None) for k in template_cols}
-                    entry.update({"id": new_id, "last_updated_at": ts, "last_updated_by_name": user['name'], 
-                                  "history": [{"ts": ts, "user": user['name'], "msg": "Bulk Import"}], "comments": [], 
-                                  "photo": "https://www.w3schools.com/howto/img_avatar.png"})
-                    st.session_state.contacts_db.append(entry)
-                st.success(f"Successfully imported {len(df_up)} contacts.")
+                uploaded_csv.seek(0)
+                st.session_state.import_report = import_csv(
+                    store, uploaded_csv, template_cols, allowed, user['name'], ts,
+                    dedupe=dup_index, decisions=decisions, default_action=dup_default, org_graph=org_graph)
+                del st.session_state.import_scan
+                st.rerun()
+
+        if 'import_report' in st.session_state:
+            report = st.session_state.import_report
+            st.success(f"Successfully imported {report['imported']} contacts, merged {report['merged']} into existing ones.")
+            if report['duplicates']:
+                st.info(f"Skipped {report['duplicates']} duplicate rows.")
+            if report['errors']:
+                st.warning(f"⚠️ Skipped {report['skipped']} rows with validation errors:")
+                st.dataframe(pd.DataFrame(report['errors']).astype(str), hide_index=True)
+            if report['loops']:
+                st.warning(f"⚠️ Kept the existing manager for {len(report['loops'])} merged contacts to avoid reporting loops:")
+                st.dataframe(pd.DataFrame(report['loops']).astype(str), hide_index=True)
+            if st.button("Dismiss Import Report"):
+                del st.session_state.import_report
                 st.rerun()
 
         st.divider()
@@ -128,7 +265,7 @@ with st.sidebar:
                 n_name = st.text_input("Full Name*")
                 n_comp = st.text_input("Company*")
                 n_appt = st.text_input("Appointment")
-                n_rep = st.selectbox("Reporting To", [None] + [p['name'] for p in st.session_state.contacts_db])
+                n_rep = st.text_input("Reporting To", help="The manager's full name; matched to a contact when saved.").strip()
                 
                 b_mode = st.radio("Birthdate Logic", ["Input Date", "Input Age Only"], horizontal=True)
                 if b_mode == "Input Date":
@@ -145,35 +282,106 @@ with st.sidebar:
                 if st.form_submit_button("Save Record"):
                     if n_name and n_comp:
                         ts = get_sg_time().strftime("%d %b %y, %H:%M")
-                        new_id = max([x['id'] for x in st.session_state.contacts_db], default=0) + 1
-                        st.session_state.contacts_db.append({
-                            "id": new_id, "name": n_name, "company": n_comp, "appointment": n_appt, "birthdate": n_bday,
-                            "country": n_ctry, "category": n_cat, "tier": n_tier, "status": n_stat, "reporting_to": n_rep,
+                        # Resolved like the edit form: a name matching no single contact is kept as text.
+                        n_rep_id = org_graph.resolve_name(n_rep, n_comp) if n_rep else None
+                        new_rec = {
+                            "name": n_name, "company": n_comp, "appointment": n_appt, "birthdate": n_bday,
+                            "country": n_ctry, "category": n_cat, "tier": n_tier, "status": n_stat,
+                            "reporting_to": n_rep or None, "reporting_to_id": n_rep_id,
                             "photo": "https://www.w3schools.com/howto/img_avatar.png", "last_updated_at": ts, 
-                            "last_updated_by_name": user['name'], "history": [{"ts": ts, "user": user['name'], "msg": "Manual Creation"}], "comments": []
-                        })
+                            "last_updated_by_name": user['name'], "comments": []
+                        }
+                        matches = dup_index.matches(new_rec)
+                        if matches:
+                            # Held until the user picks a match to merge into, or creates it anyway.
+                            st.session_state.pending_contact = (new_rec, matches)
+                        else:
+                            create_contact(new_rec)
                         st.rerun()
 
+        if 'pending_contact' in st.session_state:
+            new_rec, matches = st.session_state.pending_contact
+            st.warning(f"⚠️ **{new_rec['name']}** looks like an existing contact:")
+            for cid, score, reasons in matches:
+                # Merging only fills fields the existing contact is missing.
+                if st.button(f"Merge into {dup_index.label(cid)} ({score:.0%}: {', '.join(reasons)})", key=f"merge_new_{cid}"):
+                    ts = get_sg_time().strftime("%d %b %y, %H:%M")
+                    dedupe.merge(store, {cid: new_rec}, user['name'], ts, "Manual Merge", overwrite=False, graph=org_graph)
+                    del st.session_state.pending_contact
+                    st.rerun()
+            c_create, c_cancel = st.columns(2)
+            if c_create.button("Create Anyway"):
+                create_contact(new_rec)
+                del st.session_state.pending_contact
+                st.rerun()
+            if c_cancel.button("Discard"):
+                del st.session_state.pending_contact
+                st.rerun()
+
     st.divider()
     st.header("🔍 Filters")
-    search_q = st.text_input("Keyword Search").lower()
-    f_country = st.multiselect("Country", COUNTRIES)
-    f_cat = st.multiselect("Category", CATEGORIES)
+    search_q = st.text_input("Keyword Search", help="Searches every text field. Scope terms with a prefix, e.g. `company:tech appt:director`. Prefixes and small typos also match.").lower()
+    search_hits = search_index.search(search_q) if search_q else None
+    hit_ids = None if search_hits is None else [cid for cid, _ in search_hits]
+    # Each filter's options show how many contacts they would match under the other filter
+    # and the search, read from the facet counters rather than counted per rerun.
+    country_counts = facets.filter_counts("country", categories=st.session_state.get('f_cat'), ids=hit_ids)
+    cat_counts = facets.filter_counts("category", countries=st.session_state.get('f_country'), ids=hit_ids)
+    f_country = st.multiselect("Country", COUNTRIES, key="f_country", format_func=lambda c: f"{c} ({country_counts.get(c, 0)})")
+    f_cat = st.multiselect("Category", CATEGORIES, key="f_cat", format_func=lambda c: f"{c} ({cat_counts.get(c, 0)})")
+    page_size = st.selectbox("Cards per page", PAGE_SIZES, index=1)
 
 # --- 7. FILTERING & SORTING ---
-filtered_list = [c for c in st.session_state.contacts_db if 
-                (not search_q or search_q in c.get('name','').lower() or search_q in c.get('company','').lower()) and 
-                (not f_country or c.get('country') in f_country) and (not f_cat or c.get('category') in f_cat)]
-
-sorted_list = sorted(filtered_list, key=lambda x: (x.get('country','zzz').lower(), x.get('company','zzz').lower(), CAT_PRIORITY.get(x.get('category'), 5)))
+profiler.mark("7. Filtering & sorting")
+@st.cache_resource
+def open_contact_frame():
+    """Shared columnar view of the store, kept presorted in listing order."""
+    return ContactFrame.from_store(store, CAT_PRIORITY)
+
+# Filtering and ordering are vectorized over the columnar view; only the light
+# (id, name, country, company) columns come back, and full records are loaded per card.
+contact_frame = open_contact_frame()
+listing = contact_frame.listing(f_country, f_cat, ids=hit_ids)
+listing_pos = pd.Series(range(len(listing)), index=listing["id"])
+
+filter_sig = (search_q, tuple(f_country), tuple(f_cat), page_size)
+if st.session_state.get('list_filter_sig') != filter_sig:
+    st.session_state.list_filter_sig = filter_sig
+    st.session_state.list_page = 0
+page_count = max(1, -(-len(listing) // page_size))
+page = min(st.session_state.get('list_page', 0), page_count - 1)
+page_start = page * page_size
+page_keys = listing.iloc[page_start:page_start + page_size]
+page_ids = set(page_keys["id"].tolist())
+
+if search_hits:
+    with st.sidebar:
+        st.caption(f"🔎 Best matches ({len(listing)} results)")
+        for cid in islice((cid for cid, _ in search_hits if cid in listing_pos), 5):
+            _, hit_name, _, hit_comp = listing.iloc[listing_pos[cid]]
+            st.button(f"↪ {hit_name} · {hit_comp}", key=f"hit_{cid}", on_click=jump_to_contact,
+                      args=(cid, listing_pos[cid], page_size))
 
 # --- 8. MAIN DASHBOARD ---
 st.title("📇 Integrated Contact Dashboard")
 
 # 8.1 FULLY EMBEDDED BIRTHDAY HERO
-now = get_sg_time()
-upcoming_months = [(now.month + i - 1) % 12 + 1 for i in range(3)]
-bday_pool = [c for c in st.session_state.contacts_db if c.get('birthdate') and c['birthdate'].month in upcoming_months]
+profiler.mark("8.1 Birthday spotlight")
+today = get_sg_time().date()
+bday_window = st.segmented_control("Birthday window", BDAY_WINDOWS, default=BDAY_WINDOWS[0], label_visibility="collapsed") or BDAY_WINDOWS[0]
+if bday_window == "This Week":
+    bday_range = week_window(today)
+elif bday_window == "This Month":
+    bday_range = months_window(today, 1)
+elif bday_window == "Next 30 Days":
+    bday_range = days_window(today, 30)
+else:
+    bday_range = months_window(today, 3)
+# (year, month, first cards, total) per month; only the cards drawn are looked up.
+upcoming_months = bday_index.spotlight(*bday_range, BDAY_CARDS_PER_MONTH)
+if bday_window != "3-Month Outlook":
+    upcoming_months = [m for m in upcoming_months if m[3]] or [(today.year, today.month, [], 0)]
+has_bdays = any(m[3] for m in upcoming_months)
 
 # Outer wrapper to create the unified "Banner" look
 with st.container():
@@ -192,61 +400,132 @@ with st.container():
             <div style="background-color: #FFF4E5; padding: 0px 20px 20px 20px; border-radius: 0 0 15px 15px; border-left: 8px solid #FF9800; border-bottom: 1px solid #FFE0B2; border-right: 1px solid #FFE0B2;">
         """, unsafe_allow_html=True)
         
-        if bday_pool:
-            m_cols = st.columns(3)
-            for i, m in enumerate(upcoming_months):
-                m_name = datetime(2000, m, 1).strftime('%B')
-                m_bdays = [b for b in bday_pool if b['birthdate'].month == m]
+        if has_bdays:
+            m_cols = st.columns(max(len(upcoming_months), 3))
+            for i, (_, m, shown, m_total) in enumerate(upcoming_months):
+                m_name = calendar.month_name[m]
                 
                 with m_cols[i]:
                     # Transparent month containers to show the banner color underneath
                     st.markdown(f"<p style='font-weight: bold; color: #E65100; border-bottom: 1px solid #FFB74D; margin-bottom: 10px;'>{m_name}</p>", unsafe_allow_html=True)
-                    if m_bdays:
-                        for p in m_bdays:
+                    if shown:
+                        for p in shown:
+                            badge = f" · 🏅 Milestone {p['turning']}!" if p['milestone'] else ""
                             st.markdown(f"""
                                 <div style="padding: 8px; border-radius: 8px; background-color: white; border: 1px solid #FFE0B2; margin-bottom: 8px; box-shadow: 1px 1px 2px rgba(0,0,0,0.03);">
                                     <div style="font-weight: 600; color: #422006; font-size: 0.9rem;">{p['name']}</div>
-                                    <div style="color: #B45309; font-size: 0.75rem;">🎁 {p['birthdate'].strftime('%d %b')}</div>
+                                    <div style="color: #B45309; font-size: 0.75rem;">🎁 {p['label']} · turns {p['turning']}{badge}</div>
                                 </div>
                             """, unsafe_allow_html=True)
+                        if m_total > len(shown):
+                            st.caption(f"+{m_total - len(shown)} more in {m_name} · all are in the calendar file below")
                     else:
                         st.markdown("<p style='color: #EF6C00; font-style: italic; font-size: 0.8rem; opacity: 0.6;'>None scheduled</p>", unsafe_allow_html=True)
         
+        else:
+            st.markdown("<p style='color: #EF6C00; font-style: italic; font-size: 0.8rem; opacity: 0.6;'>None scheduled</p>", unsafe_allow_html=True)
+        
         st.markdown("</div>", unsafe_allow_html=True)
+        if has_bdays:
+            # Built only when clicked: the full window can hold thousands of events.
+            st.download_button("📅 Add to Calendar (.ics)", file_name="birthdays.ics", mime="text/calendar", on_click="ignore",
+                               data=lambda: to_ics(bday_index.between(*bday_range)))
 
 st.markdown("<br>", unsafe_allow_html=True)
 
 # 8.2 HIERARCHY TREE
+profiler.mark("8.2 Hierarchy tree")
 with st.expander("🌳 Multi-Company Reporting Hierarchy"):
-    
-    companies = sorted(list(set([x['company'] for x in st.session_state.contacts_db])))
-    for comp in companies:
+    for loop in org_graph.cycles():
+        st.warning("⚠️ Reporting loop: " + " ➜ ".join(org_graph.label(i) for i in loop + loop[:1]))
+
+    # One company's tree at a time: drawing all of them on every rerun does not scale.
+    comp = st.selectbox("Company", org_graph.companies(), index=None, placeholder="Choose a company to show its tree",
+                        key="tree_company")
+    if comp is not None:
+        stats = org_graph.company_stats(comp)
         st.markdown(f"#### 🏢 {comp}")
-        comp_contacts = [x for x in st.session_state.contacts_db if x['company'] == comp]
-        for c in comp_contacts:
-            if c.get('reporting_to'):
-                st.markdown(f"↳ **{c['name']}** ({c['appointment']}) reports to **{c['reporting_to']}**")
+        st.caption(f"{stats['headcount']} people · {stats['levels']} levels · {stats['managers']} managers · "
+                   f"widest span {stats['max_span']} · avg span {stats['avg_span']}")
+        lines = []
+        for level, cid in org_graph.tree(comp):
+            node, mgr = org_graph.node(cid), org_graph.manager_of(cid)
+            indent = "  " * level
+            if level > 0:
+                lines.append(f"{indent}- **{node['name']}** ({node['appointment']})")
+            elif mgr is not None:
+                lines.append(f"- ↳ **{node['name']}** ({node['appointment']}) reports to **{org_graph.label(mgr)}**")
             else:
-                st.markdown(f"👑 **{c['name']}** ({c['appointment']}) [Head of Chain]")
-
-# 8.3 MAIN LISTING
-curr_country, curr_company = None, None
-all_names = [p['name'] for p in st.session_state.contacts_db]
-
-for i, c in enumerate(sorted_list):
-    safe_anchor = c['name'].replace(" ", "_")
-    st.markdown(f'<div id="{safe_anchor}"></div>', unsafe_allow_html=True)
-
-    if c.get('country') != curr_country:
-        curr_country = c.get('country')
-        st.markdown(f"<h1 style='color: #1E3A8A; border-bottom: 2px solid #1E3A8A; padding-top: 20px;'>🌍 {curr_country}</h1>", unsafe_allow_html=True)
-    
-    if c.get('company') != curr_company:
-        curr_company = c.get('company')
-        st.markdown(f"<h3 style='background-color: #F3F4F6; padding: 10px; border-radius: 5px; margin-top: 10px; margin-bottom: 10px;'>🏢 {curr_company}</h3>", unsafe_allow_html=True)
-
-    age = calculate_age(c.get('birthdate'))
-    bday_str = c.get('birthdate').strftime("%d %b %Y") if c.get('birthdate') else "N/A"
+                lines.append(f"- 👑 **{node['name']}** ({node['appointment']}) [Head of Chain]")
+        st.markdown("\n".join(lines))
+
+# 8.2b GLOBAL AUDIT LOG
+profiler.mark("8.2b Audit log")
+if IS_ADMIN:
+    with st.expander("🕒 Audit Log"):
+        g1, g2 = st.columns(2)
+        log_actor = g1.selectbox("Changed by", ["Anyone"] + store.audit.actors())
+        log_range = g2.date_input("Between", value=(today - timedelta(days=7), today))
+        log_from, log_to = (log_range + (log_range[-1],))[:2] if log_range else (today, today)
+        log_filter = {
+            "actor": None if log_actor == "Anyone" else log_actor,
+            "since": datetime.combine(log_from, datetime.min.time(), SG_TZ).timestamp(),
+            "until": datetime.combine(log_to + timedelta(days=1), datetime.min.time(), SG_TZ).timestamp(),
+        }
+        log_total = store.audit.count(**log_filter)
+        log_pages = max(1, -(-log_total // 50))
+        log_pg = st.number_input(f"Page (of {log_pages}, {log_total} events)", min_value=1, max_value=log_pages, value=1) - 1
+        log_rows = store.audit.query(**log_filter, limit=50, offset=log_pg * 50)
+        if log_rows:
+            st.dataframe(pd.DataFrame([{
+                "When": format_ts(e['ts']), "By": e['actor'],
+                "Contact": (org_graph.node(e['contact_id']) or {}).get('name', e['contact_id']),
+                "Change": describe(e).replace("**", ""),
+            } for e in log_rows]), hide_index=True, width="stretch")
+
+# 8.2c CONTACT SUMMARY & EVENT HEADCOUNTS
+profiler.mark("8.2c Summary")
+with st.expander("📊 Contact Summary & Event Headcounts"):
+    statuses = dict(facets.breakdown("status"))
+    s1, s2, s3, s4 = st.columns(4)
+    s1.metric("Contacts", len(facets))
+    s2.metric("Active", statuses.get("Active", 0))
+    s3.metric("Companies", len(facets.breakdown("company")))
+    s4.metric("Countries", len([c for c, _ in facets.breakdown("country") if c is not None]))
+    for row in (("country", "category", "tier"), ("status", "golf", "dietary")):
+        for col, field in zip(st.columns(3), row):
+            col.dataframe(facet_frame(field), hide_index=True, width="stretch")
+    st.markdown("**Top companies**")
+    st.dataframe(facet_frame("company", 10), hide_index=True, width="stretch")
+    st.markdown("#### 🎟️ Event Headcounts")
+    h1, h2 = st.columns(2)
+    for col, field, options, label in ((h1, "receptions", RECEPTIONS, "Reception"), (h2, "festivities", FESTIVITIES, "Festivity")):
+        col.dataframe(pd.DataFrame(facets.headcounts(field, options)), hide_index=True, width="stretch",
+                      column_config={field: label, "guests": "Guest list", "active": "Active guests"})
+
+# 8.3 MAIN LISTING (PAGED)
+profiler.mark("8.3 Contact cards")
+def render_pager(where):
+    """Prev/next controls with the current position in the filtered listing."""
+    p1, p2, p3 = st.columns([1, 4, 1])
+    p1.button("◀ Prev", key=f"prev_{where}", on_click=set_listing_page, args=(page - 1,), disabled=page == 0)
+    shown_to = page_start + len(page_keys)
+    p2.markdown(f"<p style='text-align: center;'>Page {page + 1} of {page_count} · showing {page_start + 1 if len(page_keys) else 0}–{shown_to} of {len(listing)} contacts</p>", unsafe_allow_html=True)
+    p3.button("Next ▶", key=f"next_{where}", on_click=set_listing_page, args=(page + 1,), disabled=page >= page_count - 1)
+
+render_pager("top")
+updated_here = len(page_ids & changed_elsewhere)
+if updated_here:
+    st.toast(f"🔄 {updated_here} contact(s) on this page were updated by another user.")
+
+@st.fragment
+def render_card(cid):
+    """One contact card. Runs as a fragment, so actions inside it rerun only this card."""
+    c = store.get(cid)
+    if c is None:
+        return
+    derived = contact_frame.row(cid, get_sg_time().date())
+    age, bday_str = derived['age'], derived['birthdate_label']
     
     with st.container(border=True):
         # Header Row
@@ -260,9 +539,10 @@ for i, c in enumerate(sorted_list):
 
         col_img, col_main = st.columns([1, 4])
         with col_img:
-            st.image(c.get('photo'), width=140)
+            st.image(photo_store.resolve(c.get('photo'), "thumb") or DEFAULT_PHOTO, width=140)
             if st.button("🔎 Zoom", key=f"z_{c['id']}"): 
-                st.dialog("Full Image")(lambda: st.image(c.get('photo'), use_container_width=True))()
+                full_photo = photo_store.resolve(c.get('photo'), "full") or DEFAULT_PHOTO
+                st.dialog("Full Image")(lambda: st.image(full_photo, use_container_width=True))()
 
         with col_main:
             # Layout adjustment: Name then Appointment/Company
@@ -276,9 +556,15 @@ for i, c in enumerate(sorted_list):
             d2.write(f"📞 O: {c.get('office', 'N/A')}")
             d2.markdown(f"📧 [**{c.get('email', 'N/A')}**](mailto:{c.get('email')})")
             
-            rep = c.get('reporting_to', 'N/A')
-            if rep in all_names:
-                d3.markdown(f"👤 **Reports to:** [{rep}](#{rep.replace(' ','_')})")
+            rep_id = org_graph.manager_of(c['id'])
+            rep = org_graph.node(rep_id)['name'] if rep_id is not None else c.get('reporting_to', 'N/A')
+            if rep_id in listing_pos and listing_pos[rep_id] // page_size == page:
+                d3.markdown(f"👤 **Reports to:** [{rep}](#contact_{rep_id})")
+            elif rep_id in listing_pos:
+                if d3.button(f"👤 Reports to: {rep} ↗", key=f"jump_{c['id']}"):
+                    # Changes page, so the whole listing has to rerun, not just this card.
+                    jump_to_contact(rep_id, listing_pos[rep_id], page_size)
+                    st.rerun()
             else:
                 d3.write(f"👤 **Reports to:** {rep}")
             d3.write(f"💍 **Spouse:** {c.get('spouse', 'N/A')}")
@@ -304,111 +590,228 @@ for i, c in enumerate(sorted_list):
                 st.write(f"**Tenure Start:** {c.get('assumed_date', 'N/A')}")
 
         if IS_ADMIN:
-            with st.expander("🛠️ ADMIN: Full Record Edit & Selective Sync"):
+            # A toggle rather than an expander: expander bodies always execute, and this form is the
+            # heaviest part of a card, so it is only built for the card being edited.
+            edit_key = f"edit_base_{c['id']}"
+            if not st.toggle("🛠️ ADMIN: Full Record Edit & Selective Sync", key=f"edit_open_{c['id']}"):
+                st.session_state.pop(edit_key, None)
+            else:
+                # The form is built from the record as it was when opened, so edits saved meanwhile by
+                # other sessions don't reset the widgets; on commit the two sets of edits are merged.
+                if edit_key not in st.session_state:
+                    rid = org_graph.manager_of(c['id'])
+                    st.session_state[edit_key] = (dict(c), rid, org_graph.node(rid)['name'] if rid is not None else c.get('reporting_to') or '')
+                base, curr_rep_id, curr_rep = st.session_state[edit_key]
+                if f"edit_msg_{c['id']}" in st.session_state:
+                    st.error(st.session_state.pop(f"edit_msg_{c['id']}"))
+                elif c.get('version') != base.get('version'):
+                    st.info(f"ℹ️ {c.get('last_updated_by_name')} saved this contact after you opened the form. "
+                            "Your edits will be merged with theirs on commit.")
                 with st.form(f"edit_{c['id']}"):
                     t1, t2, t3 = st.tabs(["💼 Professional", "🚚 Logistics", "👥 Personal/Golf"])
                     with t1:
                         c1, c2 = st.columns(2)
-                        u_name = c1.text_input("Name", value=c.get('name'))
+                        u_name = c1.text_input("Name", value=base.get('name'))
                         u_photo_file = c2.file_uploader("Update Photo", type=["jpg", "png"])
-                        u_comp = c1.text_input("Company", value=c.get('company'))
-                        u_appt = c2.text_input("Appointment", value=c.get('appointment'))
-                        u_rep = c1.text_input("Reporting To", value=c.get('reporting_to','')) 
+                        u_comp = c1.text_input("Company", value=base.get('company'))
+                        u_appt = c2.text_input("Appointment", value=base.get('appointment'))
+                        u_rep = c1.text_input("Reporting To", value=curr_rep)
                         
                         st.write("---")
                         b_mode_edit = st.radio("Birthdate Logic", ["Input Date", "Input Age Only"], key=f"edit_bmode_{c['id']}", horizontal=True)
                         if b_mode_edit == "Input Date":
-                            u_bday = st.date_input("Birthdate", value=c.get('birthdate', date(1980,1,1)))
+                            u_bday = st.date_input("Birthdate", value=base.get('birthdate', date(1980,1,1)))
                         else:
-                            curr_calc_age = calculate_age(c.get('birthdate'))
+                            curr_calc_age = calculate_age(base.get('birthdate'))
                             u_age_val = st.number_input("Age", value=int(curr_calc_age) if isinstance(curr_calc_age, int) else 40)
                             u_bday = date(get_sg_time().year - u_age_val, 1, 1)
                         st.write("---")
 
-                        u_ctry = c1.selectbox("Country", COUNTRIES, index=COUNTRIES.index(c.get('country')) if c.get('country') in COUNTRIES else 0)
-                        u_tier = c1.selectbox("Tiering", TIERS, index=TIERS.index(c.get('tier')) if c.get('tier') in TIERS else 0)
-                        u_cat = c2.selectbox("Category", CATEGORIES, index=CATEGORIES.index(c.get('category')) if c.get('category') in CATEGORIES else 0)
-                        u_stat = c2.selectbox("Status", STATUS_OPTIONS, index=STATUS_OPTIONS.index(c.get('status')) if c.get('status') in STATUS_OPTIONS else 0)
+                        u_ctry = c1.selectbox("Country", COUNTRIES, index=COUNTRIES.index(base.get('country')) if base.get('country') in COUNTRIES else 0)
+                        u_tier = c1.selectbox("Tiering", TIERS, index=TIERS.index(base.get('tier')) if base.get('tier') in TIERS else 0)
+                        u_cat = c2.selectbox("Category", CATEGORIES, index=CATEGORIES.index(base.get('category')) if base.get('category') in CATEGORIES else 0)
+                        u_stat = c2.selectbox("Status", STATUS_OPTIONS, index=STATUS_OPTIONS.index(base.get('status')) if base.get('status') in STATUS_OPTIONS else 0)
                     with t2:
                         c1, c2 = st.columns(2)
-                        u_addr = c1.text_area("Office Address", value=c.get('address',''))
-                        u_fest = st.multiselect("Festivities", FESTIVITIES, default=c.get('festivities',[]))
-                        u_recep = st.multiselect("Receptions", RECEPTIONS, default=c.get('receptions',[]))
-                        u_veh = c2.text_input("Vehicle Reg", value=c.get('vehicle_reg',''))
-                        u_mob = c1.text_input("Mobile No.", value=c.get('mobile',''))
-                        u_off = c2.text_input("Office No.", value=c.get('office',''))
-                        u_email = st.text_input("Email", value=c.get('email',''))
+                        u_addr = c1.text_area("Office Address", value=base.get('address',''))
+                        u_fest = st.multiselect("Festivities", FESTIVITIES, default=base.get('festivities',[]))
+                        u_recep = st.multiselect("Receptions", RECEPTIONS, default=base.get('receptions',[]))
+                        u_veh = c2.text_input("Vehicle Reg", value=base.get('vehicle_reg',''))
+                        u_mob = c1.text_input("Mobile No.", value=base.get('mobile',''))
+                        u_off = c2.text_input("Office No.", value=base.get('office',''))
+                        u_email = st.text_input("Email", value=base.get('email',''))
                     with t3:
                         c1, c2 = st.columns(2)
-                        u_mar = c1.selectbox("Marital", MARITAL_STATUSES, index=MARITAL_STATUSES.index(c.get('marital_status')) if c.get('marital_status') in MARITAL_STATUSES else 0)
-                        u_spouse = c2.text_input("Spouse Name", value=c.get('spouse',''))
-                        u_child = c1.text_input("Children", value=c.get('children', 'Uncertain / Unknown'))
-                        u_diet = c2.text_input("Dietary", value=c.get('dietary',''))
-                        u_hob = c1.text_input("Hobbies", value=c.get('hobbies',''))
-                        u_golf = c1.selectbox("Golf?", ["No", "Yes"], index=1 if c.get('golf')=="Yes" else 0)
-                        u_handi = c2.text_input("Handicap", value=c.get('handicap',''))
-
-                    # LIVE SYNC PREVIEW
-                    colleagues = [x for x in st.session_state.contacts_db if x['company'] == u_comp and x['id'] != c['id']]
-                    st.divider()
-                    st.markdown("### 🔄 Selective Bulk Sync Preview")
-                    sync_fields = []
-                    s_c1, s_c2 = st.columns(2)
-                    if s_c1.checkbox("Sync Office Address to colleagues", key=f"s_addr_{c['id']}"): sync_fields.append(('address', u_addr))
-                    if s_c1.checkbox("Sync Tiering to colleagues", key=f"s_tier_{c['id']}"): sync_fields.append(('tier', u_tier))
-                    
-                    if sync_fields and colleagues:
-                        st.warning(f"⚠️ **Live Preview: Updating {len(colleagues)} other contacts at {u_comp}:**")
-                        for idx, col_entry in enumerate(colleagues, 1):
-                            st.markdown(f"{idx}. **{col_entry['name']}** ({col_entry['appointment']})")
+                        u_mar = c1.selectbox("Marital", MARITAL_STATUSES, index=MARITAL_STATUSES.index(base.get('marital_status')) if base.get('marital_status') in MARITAL_STATUSES else 0)
+                        u_spouse = c2.text_input("Spouse Name", value=base.get('spouse',''))
+                        u_child = c1.text_input("Children", value=base.get('children', 'Uncertain / Unknown'))
+                        u_diet = c2.text_input("Dietary", value=base.get('dietary',''))
+                        u_hob = c1.text_input("Hobbies", value=base.get('hobbies',''))
+                        u_golf = c1.selectbox("Golf?", ["No", "Yes"], index=1 if base.get('golf')=="Yes" else 0)
+                        u_handi = c2.text_input("Handicap", value=base.get('handicap',''))
 
                     if st.form_submit_button("Commit Changes"):
-                        ts = get_sg_time().strftime("%d %b %y, %H:%M")
-                        new_data = {
-                            "name": u_name, "company": u_comp, "appointment": u_appt, "birthdate": u_bday,
-                            "country": u_ctry, "tier": u_tier, "category": u_cat, "status": u_stat, "address": u_addr, "email": u_email,
-                            "festivities": u_fest, "receptions": u_recep, "vehicle_reg": u_veh, "mobile": u_mob, "office": u_off,
-                            "marital_status": u_mar, "spouse": u_spouse, "children": u_child, "reporting_to": u_rep,
-                            "dietary": u_diet, "hobbies": u_hob, "golf": u_golf, "handicap": u_handi
-                        }
-                        
-                        history_msgs = []
-                        for field, new_val in new_data.items():
-                            old_val = c.get(field)
-                            if str(old_val) != str(new_val):
-                                history_msgs.append(f"**{field.replace('_',' ').title()}**: '{old_val}' ➜ '{new_val}'")
-                        
-                        new_photo = process_uploaded_image(u_photo_file) or c.get('photo')
-                        for fk, fv in sync_fields:
-                            for col in colleagues:
-                                col[fk] = fv
-                                col['last_updated_at'], col['last_updated_by_name'] = ts, f"Sync via {user['name']}"
-                                col['history'].append({"ts": ts, "user": user['name'], "msg": f"Bulk Sync: {fk} updated"})
+                        u_rep_id = curr_rep_id if u_rep == curr_rep else org_graph.resolve_name(u_rep, u_comp, exclude=c['id'])
+                        if u_rep_id is not None and org_graph.would_cycle(c['id'], u_rep_id):
+                            st.error(f"❌ {u_rep} already reports up to {c['name']}; this would create a reporting loop.")
+                        else:
+                            ts = get_sg_time().strftime("%d %b %y, %H:%M")
+                            new_data = {
+                                "name": u_name, "company": u_comp, "appointment": u_appt, "birthdate": u_bday,
+                                "country": u_ctry, "tier": u_tier, "category": u_cat, "status": u_stat, "address": u_addr, "email": u_email,
+                                "festivities": u_fest, "receptions": u_recep, "vehicle_reg": u_veh, "mobile": u_mob, "office": u_off,
+                                "marital_status": u_mar, "spouse": u_spouse, "children": u_child, "reporting_to": u_rep,
+                                "dietary": u_diet, "hobbies": u_hob, "golf": u_golf, "handicap": u_handi
+                            }
                         
-                        c.update(new_data)
-                        c['photo'] = new_photo
-                        c['last_updated_at'], c['last_updated_by_name'] = ts, user['name']
-                        if history_msgs:
-                            c['history'].append({"ts": ts, "user": user['name'], "msg": " | ".join(history_msgs)})
-                        st.rerun()
+                            # Three-way merge: fields this admin changed vs. fields saved by others since `base`.
+                            mine, conflicts = three_way_merge(base, c, new_data)
+                            new_photo, photo_error = None, None
+                            if not conflicts:
+                                # Stored only once the edit can go through, so rejected commits leave no files behind.
+                                try:
+                                    new_photo = process_uploaded_image(u_photo_file)
+                                except ValueError as e:
+                                    photo_error = str(e)
+                            if photo_error:
+                                st.error(f"❌ {photo_error}")
+                            else:
+                                if 'reporting_to' in mine:
+                                    mine['reporting_to_id'] = u_rep_id
+                                if new_photo:
+                                    mine['photo'] = new_photo
+                                events = [{"contact_id": c['id'], "actor": user['name'], "field": field, "old": c.get(field), "new": new_val}
+                                          for field, new_val in mine.items() if field in new_data and str(c.get(field)) != str(new_val)]
+                                c.update(mine)
+                                c['last_updated_at'], c['last_updated_by_name'] = ts, user['name']
+                                try:
+                                    if conflicts:
+                                        raise StaleRecord([c['id']])
+                                    with store.transaction():
+                                        store.save_many([c], check=True)
+                                        store.audit.append(events)
+                                except StaleRecord:
+                                    labels = ", ".join(k.replace('_', ' ').title() for k in conflicts) or "this contact"
+                                    st.session_state[f"edit_msg_{c['id']}"] = (
+                                        f"❌ Not saved: {labels} was changed by someone else while you were editing. "
+                                        "The form now shows the latest values; re-apply your edits and commit again.")
+                                st.session_state.pop(edit_key, None)
+                                rerun_after_write(c['id'], [c['id']], () if conflicts else mine)
+
+                # SELECTIVE BULK SYNC
+                # Outside the form so the dry-run diff follows the widgets live. Colleagues come from
+                # the org graph's company index; the write is one batch with one aggregated audit event.
+                st.markdown("### 🔄 Selective Bulk Sync")
+                colleague_ids = org_graph.colleagues(c['id'])
+                s1, s2 = st.columns(2)
+                sync_keys = s1.multiselect("Fields to copy from this contact", list(SYNC_FIELDS),
+                                           format_func=SYNC_FIELDS.get, key=f"sync_f_{c['id']}")
+                sync_scope = s2.radio("Apply to", list(SYNC_SCOPES), key=f"sync_s_{c['id']}")
+                sync_where = SYNC_SCOPES[sync_scope](c)
+                sync_changes = {k: c.get(k) for k in sync_keys}
+                sync_diff = batch.plan(store, colleague_ids, sync_changes, sync_where) if sync_changes else []
+                if sync_diff:
+                    n_sync = len({d['id'] for d in sync_diff})
+                    st.warning(f"⚠️ **Dry run: {len(sync_diff)} changes to {n_sync} of {len(colleague_ids)} other contacts at {c.get('company')}**")
+                    st.dataframe(pd.DataFrame(sync_diff).astype(str), hide_index=True, width="stretch",
+                                 column_order=("name", "field", "old", "new"))
+                elif sync_changes:
+                    st.caption("Colleagues in scope already match; nothing to sync.")
+                b1, b2 = st.columns(2)
+                if b1.button("Apply Sync", key=f"sync_go_{c['id']}", disabled=not sync_diff):
+                    seq, _ = batch.apply(store, colleague_ids, sync_changes, user['name'], sync_scope, sync_where,
+                                         source_id=c['id'], ts=get_sg_time().strftime("%d %b %y, %H:%M"))
+                    st.session_state[f"last_batch_{c['id']}"] = seq
+                    rerun_after_write(c['id'], [d['id'] for d in sync_diff], sync_changes)
+                last_batch = st.session_state.get(f"last_batch_{c['id']}")
+                if last_batch is not None and b2.button("↩️ Undo last sync", key=f"sync_undo_{c['id']}"):
+                    try:
+                        batch.undo(store, last_batch, user['name'], ts=get_sg_time().strftime("%d %b %y, %H:%M"))
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
+                    else:
+                        del st.session_state[f"last_batch_{c['id']}"]
+                        rerun_after_write(c['id'], colleague_ids, SYNC_FIELDS)
 
-        st.info(f"🚩 **Last Updated:** {c.get('last_updated_at')} by **{c.get('last_updated_by_name')}**")
+        fresh = " · 🔄 *updated since your last view*" if c['id'] in changed_elsewhere else ""
+        st.info(f"🚩 **Last Updated:** {c.get('last_updated_at')} by **{c.get('last_updated_by_name')}**{fresh}")
         
         h_col, c_col = st.columns(2)
         with h_col:
-            with st.expander(f"🕒 Audit History ({len(c.get('history', []))})"):
-                for entry in reversed(c.get('history', [])):
-                    st.caption(f"📅 {entry['ts']} | 👤 {entry['user']}")
-                    st.markdown(f"- {entry['msg']}")
+            n_events = store.audit.count(contact_id=c['id'])
+            with st.expander(f"🕒 Audit History ({n_events})"):
+                a_pg = st.session_state.get(f"audit_pg_{c['id']}", 0)
+                for entry in store.audit.query(contact_id=c['id'], limit=AUDIT_PAGE_SIZE, offset=a_pg * AUDIT_PAGE_SIZE):
+                    st.caption(f"📅 {format_ts(entry['ts'])} | 👤 {entry['actor']}")
+                    st.markdown(f"- {describe(entry)}")
+                if n_events > AUDIT_PAGE_SIZE:
+                    a1, a2 = st.columns(2)
+                    a1.button("◀ Newer", key=f"a_new_{c['id']}", on_click=set_audit_page, args=(c['id'], a_pg - 1), disabled=a_pg == 0)
+                    a2.button("Older ▶", key=f"a_old_{c['id']}", on_click=set_audit_page, args=(c['id'], a_pg + 1),
+                              disabled=(a_pg + 1) * AUDIT_PAGE_SIZE >= n_events)
         with c_col:
             with st.expander(f"💬 Comments ({len(c.get('comments', []))})"):
                 for m in c.get('comments', []): st.write(f"**{m['user_name']}:** {m['text']}")
                 new_com = st.text_input("Add Comment", key=f"com_{c['id']}")
                 if st.button("Post", key=f"btn_{c['id']}"):
-                    c['comments'].append({"user_name": user['name'], "text": new_com})
-                    ts = get_sg_time().strftime("%d %b %y, %H:%M")
-                    c['history'].append({"ts": ts, "user": user['name'], "msg": "New Comment Added"})
-                    st.rerun()
+                    # Appended to the stored list inside the transaction, so comments posted meanwhile
+                    # from other sessions are kept rather than overwritten by this card's copy.
+                    with store.transaction():
+                        latest = store.get(c['id'])
+                        latest.setdefault('comments', []).append({"user_name": user['name'], "text": new_com})
+                        store.save_many([latest], check=True)
+                        store.audit.append([{"contact_id": c['id'], "actor": user['name'], "msg": "New Comment Added"}])
+                    rerun_after_write(c['id'], [c['id']], ["comments"])
+
+# Seed the group headers with the row just before this page so continuing groups are marked.
+prev_country, prev_company = tuple(listing.iloc[page_start - 1][["country", "company"]]) if page_start > 0 else (None, None)
+curr_country, curr_company = None, None
+
+for i, (cid, _, row_country, row_company) in enumerate(page_keys.itertuples(index=False)):
+    st.markdown(f'<div id="contact_{cid}"></div>', unsafe_allow_html=True)
+
+    if row_country != curr_country:
+        curr_country = row_country
+        cont = " (cont.)" if i == 0 and curr_country == prev_country else ""
+        st.markdown(f"<h1 style='color: #1E3A8A; border-bottom: 2px solid #1E3A8A; padding-top: 20px;'>🌍 {curr_country}{cont}</h1>", unsafe_allow_html=True)
+    
+    if row_company != curr_company:
+        curr_company = row_company
+        cont = " (cont.)" if i == 0 and (curr_country, curr_company) == (prev_country, prev_company) else ""
+        st.markdown(f"<h3 style='background-color: #F3F4F6; padding: 10px; border-radius: 5px; margin-top: 10px; margin-bottom: 10px;'>🏢 {curr_company}{cont}</h3>", unsafe_allow_html=True)
+
+    render_card(int(cid))
+
+render_pager("bottom")
+
+if 'scroll_to' in st.session_state:
+    target = st.session_state.pop('scroll_to')
+    st.iframe(f"<script>window.parent.document.getElementById({json.dumps(target)})?.scrollIntoView();</script>", height=1)
 
+profiler.mark("8.4 Export")
 st.divider()
-st.download_button("📥 Full Export (CSV)", data=pd.DataFrame(st.session_state.contacts_db).astype(str).to_csv(index=False), file_name="db_export.csv")
\ No newline at end of file
+# Export options are cheap widgets; the file itself is only generated (in chunks) when the
+# download button is clicked, via a callable `data`.
+with st.expander("📥 Export Contacts"):
+    e1, e2 = st.columns(2)
+    ex_fmt = e1.selectbox("Format", available_formats())
+    ex_nested = e2.radio("History & comments", ["Omit", "Flatten"], horizontal=True)
+    ex_cols_all = [k for k in CONTACT_FIELDS if k not in ('history', 'comments')] + ['reporting_to_id']
+    ex_cols = st.multiselect("Columns", ex_cols_all, default=[k for k in ex_cols_all if k != 'photo'])
+    ex_filtered = st.checkbox(f"Only contacts matching the current filters ({len(listing)})", value=bool(search_q or f_country or f_cat))
+    ex_ids = listing["id"].tolist() if ex_filtered else None
+    ex_all_cols = ex_cols + (['history', 'comments'] if ex_nested == "Flatten" else [])
+    ext, mime = EXPORT_FORMATS[ex_fmt]
+    st.download_button(f"📥 Download {ex_fmt}", file_name=f"db_export.{ext}", mime=mime, on_click="ignore",
+                       data=lambda: write_export(ex_fmt, iter_frames(store, ex_ids, ex_all_cols, nested=ex_nested.lower())))
+
+# --- 9. RERUN PROFILE ---
+if profiler.enabled:
+    laps = pd.DataFrame(profiler.finish())
+    with st.sidebar:
+        with st.expander("⏱️ Rerun Profile", expanded=True):
+            st.caption(f"{laps['ms'].sum():.0f} ms total · largest section peak {laps['peak_kb'].max() / 1024:.1f} MB")
+            st.dataframe(laps, hide_index=True, column_config={
+                "section": "Section", "ms": st.column_config.NumberColumn("Wall (ms)", format="%.1f"),
+                "alloc_kb": st.column_config.NumberColumn("Net alloc (KB)", format="%.0f"),
+                "peak_kb": st.column_config.NumberColumn("Peak (KB)", format="%.0f")})
@@ -0,0 +1,49 @@
+import pytest
+
+from contactdb import batch, open_store
+
+
+def _company():
+    store = open_store(":memory:")
+    ids = store.insert_many([{"name": n, "company": "A", "tier": "C", "country": c}
+                             for n, c in (("Source", "Japan"), ("One", "Japan"), ("Two", "UK"))])
+    return store, ids
+
+
+def test_sync_is_logged_once_and_shown_on_every_synced_contact():
+    store, (src, one, two) = _company()
+    store.update(src, {"tier": "A"})
+    seq, n = batch.apply(store, [one, two], {"tier": "A"}, "tester", "Same company", source_id=src)
+    assert n == 2 and store.audit.count() == 1
+    for cid in (src, one, two):
+        assert [e["seq"] for e in store.audit.query(contact_id=cid)] == [seq]
+        assert store.audit.count(contact_id=cid) == 1
+    history = store.audit.for_contacts([one, two])
+    assert {cid: [e["seq"] for e in events] for cid, events in history.items()} == {one: [seq], two: [seq]}
+    batch.undo(store, seq, "tester")
+    assert store.audit.count(contact_id=one) == 2
+
+
+def test_undo_keeps_fields_edited_after_the_sync():
+    store, (src, one, two) = _company()
+    seq, _ = batch.apply(store, [one, two], {"tier": "A", "address": "1 Road"}, "tester", "Same company")
+    store.update(one, {"tier": "B"})
+    assert batch.undo(store, seq, "tester") == 2
+    assert (store.get(one)["tier"], store.get(one)["address"]) == ("B", None)
+    assert (store.get(two)["tier"], store.get(two)["address"]) == ("C", None)
+
+
+def test_a_sync_can_only_be_undone_once():
+    store, (src, one, two) = _company()
+    seq, _ = batch.apply(store, [one, two], {"tier": "A"}, "tester", "Same company")
+    batch.undo(store, seq, "tester")
+    with pytest.raises(ValueError):
+        batch.undo(store, seq, "tester")
+
+
+def test_where_narrows_the_selection():
+    store, (src, one, two) = _company()
+    in_japan = lambda r: r.get("country") == "Japan"
+    assert [d["id"] for d in batch.plan(store, [one, two], {"tier": "A"}, where=in_japan)] == [one]
+    seq, n = batch.apply(store, [one, two], {"tier": "A"}, "tester", "Same company & country", where=in_japan)
+    assert n == 1 and store.get(two)["tier"] == "C"
@@ -0,0 +1,15 @@
+from datetime import date
+
+from contactdb.birthdays import BirthdayIndex, months_window
+
+
+def test_spotlight_caps_each_month_and_counts_the_rest():
+    index = BirthdayIndex()
+    index.update([{"id": i, "name": f"P{i:02d}", "birthdate": date(1980, 1 + i % 2, 1 + i % 28)} for i in range(40)])
+    index.update([{"id": 99, "name": "Leap", "birthdate": date(1980, 2, 29)}])
+    window = months_window(date(2025, 1, 10), 3)
+    months = index.spotlight(*window, per_month=5)
+    every = index.between(*window)
+    assert [(y, m, total) for y, m, _, total in months] == [(2025, 1, 20), (2025, 2, 21), (2025, 3, 0)]
+    for y, m, shown, _ in months:
+        assert shown == [e for e in every if e["date"].month == m][:5]
@@ -0,0 +1,43 @@
+from contactdb import open_store
+from contactdb.dedupe import merge
+from contactdb.hierarchy import OrgGraph
+
+
+def _seed():
+    store = open_store(":memory:")
+    one, two = store.insert_many([{"name": "Boss One", "company": "A"}, {"name": "Boss Two", "company": "A"}])
+    staff = store.insert({"name": "Staff", "company": "A", "reporting_to": "Boss One", "reporting_to_id": one})
+    return store, OrgGraph.from_store(store), one, two, staff
+
+
+def test_merged_manager_name_replaces_the_manager_id():
+    store, graph, one, two, staff = _seed()
+    merged, loops = merge(store, {staff: {"reporting_to": "Boss Two"}}, "tester", "ts", "Import Merge", graph=graph)
+    assert merged[staff]["reporting_to_id"] == two and loops == []
+    assert graph.manager_of(staff) == two
+
+
+def test_merge_refuses_a_reporting_loop():
+    store, graph, one, two, staff = _seed()
+    merged, loops = merge(store, {one: {"reporting_to": "Staff", "tier": "A"}}, "tester", "ts", "Import Merge", graph=graph)
+    assert loops == [one] and merged[one] == {"tier": "A"}
+    assert graph.manager_of(one) is None
+
+
+def test_manager_id_is_not_taken_without_its_name():
+    store, graph, one, two, staff = _seed()
+    store.update(one, {"reporting_to": "Nobody Known"})
+    merged, loops = merge(store, {one: {"reporting_to": "Staff", "reporting_to_id": staff}}, "tester", "ts",
+                          "Manual Merge", overwrite=False, graph=graph)
+    assert merged == {} and loops == []
+    assert store.get(one).get("reporting_to_id") is None and graph.cycles() == []
+
+
+def test_manager_id_with_the_same_name_is_loop_checked():
+    store, graph, one, two, staff = _seed()
+    store.insert({"name": "Staff", "company": "A"})   # "Staff" is now ambiguous, so stays unresolved
+    store.update(one, {"reporting_to": "Staff"})
+    merged, loops = merge(store, {one: {"reporting_to": "Staff", "reporting_to_id": staff}}, "tester", "ts",
+                          "Manual Merge", overwrite=False, graph=graph)
+    assert merged == {} and loops == [one]
+    assert graph.cycles() == []
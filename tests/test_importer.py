@@ -0,0 +1,45 @@
+import io
+from datetime import date
+
+import pandas as pd
+
+from contactdb import open_store
+from contactdb.importer import coerce_chunk, import_csv, validate_chunk
+
+COLUMNS = ["name", "company", "country", "birthdate", "receptions"]
+ALLOWED = {"country": ["Singapore", "Japan"]}
+
+
+def _csv(rows):
+    return io.StringIO(pd.DataFrame(rows, columns=COLUMNS).to_csv(index=False))
+
+
+def test_coerce_parses_dates_with_fallback_and_splits_lists():
+    raw = pd.DataFrame({"name": [" A ", "B", "C"], "birthdate": ["1980-12-25", "25/12/1980", "someday"],
+                        "receptions": ["NYR; ALSE", "['NYR', 'BigShow']", ""]}, dtype=str)
+    df, bad = coerce_chunk(raw, ["name", "birthdate", "receptions"])
+    assert df["name"].tolist() == ["A", "B", "C"]
+    assert df["birthdate"].tolist() == [date(1980, 12, 25), date(1980, 12, 25), None]
+    assert bad["birthdate"].tolist() == [None, None, "someday"]
+    assert df["receptions"].tolist() == [["NYR", "ALSE"], ["NYR", "BigShow"], []]
+
+
+def test_validate_reports_each_bad_cell_by_file_row():
+    raw = pd.DataFrame({"name": ["A", "", "C"], "company": ["X", "Y", "Z"], "country": ["Japan", "Japan", "Mars"],
+                        "birthdate": ["1980-01-01", "", "not a date"]}, dtype=str)
+    df, bad = coerce_chunk(raw, ["name", "company", "country", "birthdate"])
+    valid, errors = validate_chunk(df, bad, ALLOWED, row_offset=10)
+    assert valid.tolist() == [True, False, False]
+    assert [(e["row"], e["field"], e["value"]) for e in errors] == [
+        (12, "name", None), (13, "country", "Mars"), (13, "birthdate", "not a date")]
+
+
+def test_import_skips_invalid_rows_and_allocates_ids_per_chunk():
+    store = open_store(":memory:")
+    store.insert({"name": "Existing", "company": "X"})
+    rows = [[f"P{i}", "X", "Japan", "1980-01-01", "NYR"] for i in range(5)] + [["", "X", "Japan", "", ""]]
+    report = import_csv(store, _csv(rows), COLUMNS, ALLOWED, "tester", "ts", chunksize=2)
+    assert (report["imported"], report["skipped"]) == (5, 1)
+    assert [(e["row"], e["field"]) for e in report["errors"]] == [(6, "name")]
+    assert [(r["id"], r["name"]) for r in store.all()] == [(1, "Existing")] + [(i + 2, f"P{i}") for i in range(5)]
+    assert store.get(2)["receptions"] == ["NYR"] and store.get(2)["birthdate"] == date(1980, 1, 1)
@@ -0,0 +1,12 @@
+from contactdb.search import SearchIndex
+
+
+def test_prefix_returns_every_token_in_range():
+    index = SearchIndex()
+    # 100 email tokens `tan000`..`tan099` sort ahead of `tanaka`.
+    records = [{"id": i, "name": f"Person {i}", "email": f"tan{i:03d}@mail.com"} for i in range(100)]
+    records += [{"id": 100 + i, "name": f"Tanaka {i}"} for i in range(5)]
+    index.update(records)
+    hits = {cid for cid, _ in index.search("tan")}
+    assert hits == set(range(105))
+    assert {cid for cid, _ in index.search("tana")} == set(range(100, 105))
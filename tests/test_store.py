@@ -0,0 +1,76 @@
+import pytest
+
+from contactdb import ContactStore, StaleRecord, open_store, three_way_merge
+
+
+def test_listeners_only_see_committed_writes():
+    store = open_store(":memory:")
+    seen = []
+    store.subscribe(lambda records: seen.append([r["name"] for r in records]))
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.insert({"name": "Rolled Back", "company": "A"})
+            assert seen == []
+            raise RuntimeError("audit write failed")
+    assert seen == [] and store.count() == 0
+    with store.transaction():
+        store.insert({"name": "Kept", "company": "A"})
+        assert seen == []
+    assert seen == [["Kept"]]
+
+
+def test_incomplete_backend_fails_on_construction():
+    class ReadOnly(ContactStore):
+        def all(self):
+            return []
+
+    with pytest.raises(TypeError, match="abstract"):
+        ReadOnly()
+
+
+def test_project_reads_payload_fields_with_lists_intact():
+    store = open_store(":memory:")
+    store.insert_many([{"name": "A", "company": "C", "receptions": ["NYR"], "photo": "[not a list]"},
+                       {"name": "B", "tier": "A"}])
+    assert store.project(("photo", "id", "receptions", "tier")) == [("[not a list]", 1, ["NYR"], None),
+                                                                   (None, 2, None, "A")]
+    assert store.project(("id", "tier")) == [(1, None), (2, "A")]
+    assert store.project(("id", "name")) == [(1, "A"), (2, "B")]
+
+
+def test_checked_save_rejects_a_stale_record():
+    store = open_store(":memory:")
+    cid = store.insert({"name": "A", "company": "C", "tier": "B"})
+    mine, theirs = store.get(cid), store.get(cid)
+    theirs["tier"] = "A"
+    store.save_many([theirs], check=True)
+    mine["tier"] = "C"
+    with pytest.raises(StaleRecord) as err:
+        store.save_many([mine], check=True)
+    assert err.value.ids == [cid] and store.get(cid)["tier"] == "A"
+    mine = store.get(cid)
+    mine["tier"] = "C"
+    store.save_many([mine], check=True)
+    assert store.get(cid)["tier"] == "C"
+
+
+def test_three_way_merge_keeps_other_edits_and_flags_conflicts():
+    base = {"name": "A", "tier": "B", "status": "Active", "address": "1 Road"}
+    current = {**base, "tier": "A", "address": "2 Road"}              # saved by someone else
+    changes, conflicts = three_way_merge(base, current, {**base, "status": "Inactive", "address": "3 Road"})
+    assert changes == {"status": "Inactive", "address": "3 Road"} and conflicts == ["address"]
+    changes, conflicts = three_way_merge(base, current, {**base, "address": "2 Road"})
+    assert changes == {"address": "2 Road"} and conflicts == []      # same value: no conflict
+
+
+def test_changes_since_skips_the_callers_own_writes():
+    store = open_store(":memory:")
+    a, b = store.insert_many([{"name": "A", "company": "C"}, {"name": "B", "company": "C"}])
+    revision, _ = store.changes_since(None)
+    store.set_origin("session-1")
+    store.update(a, {"tier": "A"})
+    store.set_origin("session-2")
+    store.update(b, {"tier": "B"})
+    assert store.changes_since(revision, exclude_origin="session-1")[1] == {b}
+    assert store.changes_since(revision, exclude_origin="session-2")[1] == {a}
+    assert store.changes_since(None)[1] is None